@@ -0,0 +1,159 @@
+import datetime
+import sys
+from array import array
+
+from db import db, get_meta, set_meta
+from persistence import write_behind
+
+# Κάθε granularity αποθηκεύεται σε chunks σταθερού μεγέθους (ένα BLOB ανά chunk):
+# hour -> μία μέρα (24), day -> ένας μήνας (31), month -> ένας χρόνος (12)
+CHUNK_SIZES = {"hour": 24, "day": 31, "month": 12}
+MAX_BUCKETS = {"hour": 168, "day": 90, "month": 24}
+
+
+def bucket(granularity: str, when: datetime.datetime):
+    # -> (chunk start, θέση μέσα στο chunk)
+    if granularity == "hour":
+        return when.strftime("%Y-%m-%d"), when.hour
+    if granularity == "day":
+        return when.strftime("%Y-%m"), when.day - 1
+    return when.strftime("%Y"), when.month - 1
+
+
+def _previous(granularity: str, when: datetime.datetime) -> datetime.datetime:
+    if granularity == "hour":
+        return when - datetime.timedelta(hours=1)
+    if granularity == "day":
+        return when - datetime.timedelta(days=1)
+    return (when.replace(day=1) - datetime.timedelta(days=1)).replace(day=1)
+
+
+def _label(granularity: str, when: datetime.datetime) -> str:
+    return when.strftime({"hour": "%d/%m %H:00", "day": "%d/%m", "month": "%m/%Y"}[granularity])
+
+
+def _pack(counts: array) -> bytes:
+    # Little-endian uint32, ανεξάρτητα από την αρχιτεκτονική
+    if sys.byteorder == "big":
+        counts = array("I", counts)
+        counts.byteswap()
+    return counts.tobytes()
+
+
+def _unpack(blob: bytes) -> array:
+    counts = array("I")
+    counts.frombytes(blob)
+    if sys.byteorder == "big":
+        counts.byteswap()
+    return counts
+
+
+def _upsert_sql(key, counts):
+    return (
+        "INSERT INTO vote_rollups(server_id, granularity, start, counts) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(server_id, granularity, start) DO UPDATE SET counts = excluded.counts",
+        (*key, _pack(counts))
+    )
+
+
+class VoteRollups:
+    # Συγκεντρωτικά ψήφων ανά server × ώρα/μέρα/μήνα, ενημερώνονται σε κάθε ψήφο.
+    # Ζουν σε δικό τους πίνακα, οπότε το μηνιαίο reset δεν τα αγγίζει.
+    def __init__(self, database=db):
+        self.db = database
+        self.chunks = {}   # (server_id, granularity, start) -> array("I")
+        self.floor = {}    # granularity -> τρέχον chunk στο load(): ό,τι είναι >= φορτώθηκε
+
+    async def load(self):
+        now = datetime.datetime.now()
+        self.floor = {g: bucket(g, now)[0] for g in CHUNK_SIZES}
+        rows = await self.db.run(_load_current, self.floor)
+        for server_id, granularity, start, blob in rows:
+            self.chunks[(server_id, granularity, start)] = _unpack(blob)
+
+    def record(self, server_id: int, when: datetime.datetime = None):
+        when = when or datetime.datetime.now()
+        for granularity, size in CHUNK_SIZES.items():
+            start, idx = bucket(granularity, when)
+            key = (server_id, granularity, start)
+            counts = self.chunks.get(key)
+            if counts is None:
+                # Νεότερο από το floor και όχι στη μνήμη = δεν υπάρχει ακόμα στη βάση
+                counts = self.chunks[key] = array("I", bytes(4 * size))
+            counts[idx] += 1
+            write_behind.mark_dirty(("rollup", *key), lambda key=key: [_upsert_sql(key, self.chunks[key])])
+
+    async def series(self, server_id: int, granularity: str, n: int, now: datetime.datetime = None) -> list:
+        # Οι τελευταίες n περίοδοι, από την παλαιότερη στη νεότερη: [(label, votes), ...]
+        # Το κόστος εξαρτάται μόνο από το n, όχι από τον αριθμό των ψήφων.
+        n = max(1, min(n, MAX_BUCKETS[granularity]))
+        when = now or datetime.datetime.now()
+        buckets = []
+        for _ in range(n):
+            buckets.append((_label(granularity, when), *bucket(granularity, when)))
+            when = _previous(granularity, when)
+        buckets.reverse()
+
+        missing = sorted({
+            start for _, start, _ in buckets
+            if (server_id, granularity, start) not in self.chunks and start < self.floor.get(granularity, "")
+        })
+        if missing:
+            placeholders = ", ".join("?" * len(missing))
+            rows = await self.db.fetchall(
+                f"SELECT start, counts FROM vote_rollups WHERE server_id = ? AND granularity = ? "
+                f"AND start IN ({placeholders})",
+                (server_id, granularity, *missing)
+            )
+            found = {start: _unpack(blob) for start, blob in rows}
+            for start in missing:
+                self.chunks[(server_id, granularity, start)] = found.get(start) or array("I")
+
+        series = []
+        for label, start, idx in buckets:
+            counts = self.chunks.get((server_id, granularity, start))
+            series.append((label, counts[idx] if counts and idx < len(counts) else 0))
+        return series
+
+
+def add_to_rollups(conn, server_id: int, when: datetime.datetime):
+    # Για το replay του vote journal, απευθείας στη βάση
+    for granularity, size in CHUNK_SIZES.items():
+        start, idx = bucket(granularity, when)
+        row = conn.execute(
+            "SELECT counts FROM vote_rollups WHERE server_id = ? AND granularity = ? AND start = ?",
+            (server_id, granularity, start)
+        ).fetchone()
+        counts = _unpack(row[0]) if row else array("I", bytes(4 * size))
+        counts[idx] += 1
+        conn.execute(*_upsert_sql((server_id, granularity, start), counts))
+
+
+def _load_current(conn, floor):
+    _seed_from_votes(conn)
+    return conn.execute(
+        "SELECT server_id, granularity, start, counts FROM vote_rollups "
+        "WHERE (granularity = 'hour' AND start >= ?) OR (granularity = 'day' AND start >= ?) "
+        "OR (granularity = 'month' AND start >= ?)",
+        (floor["hour"], floor["day"], floor["month"])
+    ).fetchall()
+
+
+def _seed_from_votes(conn):
+    # Μία φορά: οι ψήφοι που υπάρχουν ήδη μπαίνουν στα day/month rollups (η ώρα δεν είναι γνωστή)
+    if get_meta(conn, "vote_rollups_seeded"):
+        return
+    chunks = {}
+    for server_id, day, count in conn.execute("SELECT server_id, day, COUNT(*) FROM votes GROUP BY server_id, day"):
+        when = datetime.datetime.strptime(day, "%Y-%m-%d")
+        for granularity in ("day", "month"):
+            start, idx = bucket(granularity, when)
+            counts = chunks.setdefault((server_id, granularity, start), array("I", bytes(4 * CHUNK_SIZES[granularity])))
+            counts[idx] += count
+    with conn:
+        for key, counts in chunks.items():
+            conn.execute(*_upsert_sql(key, counts))
+        set_meta(conn, "vote_rollups_seeded", True)
+
+
+vote_rollups = VoteRollups()
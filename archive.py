@@ -0,0 +1,83 @@
+import datetime
+import json
+import time
+
+from db import db
+from pipeline import ensure_ranking
+
+
+def previous_month(now: datetime.datetime = None) -> str:
+    now = now or datetime.datetime.now()
+    return (now.replace(day=1) - datetime.timedelta(days=1)).strftime("%Y-%m")
+
+
+def parse_month(text: str):
+    # Δεκτά: 2025-07, 07/2025, 7/2025
+    for fmt in ("%Y-%m", "%m/%Y"):
+        try:
+            return datetime.datetime.strptime(text, fmt).strftime("%Y-%m")
+        except ValueError:
+            pass
+    return None
+
+
+class LeaderboardArchive:
+    # Μία εγγραφή ανά guild και μήνα με την τελική κατάταξη, γραμμένη πριν το reset.
+    # Append-only: ένα snapshot που υπάρχει ήδη δεν ξαναγράφεται.
+    def __init__(self, database=db):
+        self.db = database
+        self.months = {}    # guild_id -> {month: {"servers": [...], "by_id": {id: entry}}}
+
+    async def load(self, guild_id: int) -> dict:
+        if guild_id not in self.months:
+            rows = await self.db.fetchall(
+                "SELECT month, data FROM leaderboard_archive WHERE guild_id = ? ORDER BY month", (guild_id,)
+            )
+            self.months[guild_id] = {month: _index(json.loads(data)) for month, data in rows}
+        return self.months[guild_id]
+
+    async def snapshot(self, state, month: str) -> bool:
+        # Τα σύνολα ξαναβγαίνουν από το VoteStore, όχι από ένα ranking που μπορεί να είναι παλιό
+        state.ranking.invalidate()
+        ensure_ranking(state)
+
+        # Οι non-premium με τη σειρά του ranking και μετά οι premium χωρίς rank
+        servers = state.servers.all()
+        entries = [[s["id"], s["name"], s.get("votes", 0), s["rank"]] for s in state.ranking.ranked()]
+        entries += [[s["id"], s["name"], s.get("votes", 0), None] for s in servers if s.get("premium")]
+        record = {"taken_at": int(time.time()), "servers": entries}
+
+        # Απευθείας στη βάση (όχι write-behind): πρέπει να υπάρχει πριν σβηστούν οι ψήφοι
+        inserted = await self.db.run(_insert_snapshot, state.guild_id, month, json.dumps(record, separators=(",", ":")))
+        if inserted and state.guild_id in self.months:
+            self.months[state.guild_id][month] = _index(record)
+        return inserted
+
+    async def get(self, guild_id: int, month: str):
+        return (await self.load(guild_id)).get(month)
+
+    async def rank_history(self, guild_id: int, server_id: int) -> list:
+        # [(month, rank, votes), ...] – ένα lookup ανά μήνα στο by_id
+        history = []
+        for month, snapshot in (await self.load(guild_id)).items():
+            entry = snapshot["by_id"].get(server_id)
+            if entry:
+                history.append((month, entry[3], entry[2]))
+        return history
+
+
+def _index(record: dict) -> dict:
+    record["by_id"] = {entry[0]: entry for entry in record["servers"]}
+    return record
+
+
+def _insert_snapshot(conn, guild_id, month, data):
+    with conn:
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO leaderboard_archive(guild_id, month, data) VALUES (?, ?, ?)",
+            (guild_id, month, data)
+        )
+    return cursor.rowcount > 0
+
+
+leaderboard_archive = LeaderboardArchive()
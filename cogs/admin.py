@@ -1,51 +1,36 @@
 
 import discord
 from discord.ext import commands
-import json
-import os
-from utils import generate_embed
+from utils import generate_embed, chunk_embeds
 from views import VoteView
-import aiohttp
+from dispatch import dispatcher, send_message
+from guilds import guild_states, DEFAULT_CONFIG, parse_config_value
+from pipeline import vote_pipeline
+from linkcheck import LinkChecker
 import time
 
 
-SERVERS_FILE = "servers.json"
-VOTES_FILE = "votes.json"
-
-def load_servers():
-    if os.path.exists(SERVERS_FILE):
-        with open(SERVERS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def save_servers(servers):
-    with open(SERVERS_FILE, "w") as f:
-        json.dump(servers, f, indent=2)
-
-def load_votes():
-    if os.path.exists(VOTES_FILE):
-        with open(VOTES_FILE, "r") as f:
-            content = f.read().strip()
-            if content:
-                return json.loads(content)
-    return {}
-
-def save_votes(votes):
-    with open(VOTES_FILE, "w") as f:
-        json.dump(votes, f)
 
 class AdminCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.link_checker = LinkChecker()
+
+    async def cog_load(self):
+        await self.link_checker.start()
+
+    async def cog_unload(self):
+        await self.link_checker.close()
 
     @commands.command()
     @commands.has_permissions(administrator=True)
     async def setup(self, ctx):
         print(f"🟡 [{time.time()}] Ξεκίνησε η εντολή !setup")
 
-        channel = discord.utils.get(ctx.guild.text_channels, name="📜︱server-list")
+        state = guild_states.get(ctx.guild.id)
+        channel = state.channel(ctx.guild, "server_list_channel")
         if not channel:
-            await ctx.send("❌ Δεν βρέθηκε το κανάλι 📜︱server-list.")
+            await ctx.send(f"❌ Δεν βρέθηκε το κανάλι {state.config['server_list_channel']}.")
             return
 
         print(f"🔵 [{time.time()}] Ξεκινάει το purge...")
@@ -53,17 +38,17 @@ class AdminCog(commands.Cog):
         print(f"🟢 [{time.time()}] Ολοκληρώθηκε το purge")
 
         print(f"📂 [{time.time()}] Ξεκινάει φόρτωμα servers...")
-        servers = load_servers()
-        votes = load_votes()
+        servers = state.servers.all()
         print(f"✅ [{time.time()}] Ολοκληρώθηκε φόρτωμα servers")
 
         for server in servers:
-            server["votes"] = votes.get(server["name"], {}).get("total", 0)
+            server["votes"] = state.votes.total(server["id"])
             embed = generate_embed(server, context="serverlist")
-            message = await channel.send(embed=embed, view=VoteView(server["name"]))
-            server["message_id"] = message.id
+            # Με τη σειρά, ώστε να κρατηθεί η διάταξη στο κανάλι
+            message = await send_message(channel, embed=embed, view=VoteView(server["id"]))
+            state.servers.set_message_id(server, message.id)
 
-        save_servers(servers)
+        state.servers.save()
         print(f"🏁 [{time.time()}] Ολοκληρώθηκε η αποστολή embeds")
 
     @commands.command()
@@ -71,11 +56,15 @@ class AdminCog(commands.Cog):
     async def addserver(self, ctx, name, chronicle, rates, website, discord_link, thumbnail, image=None):
         await ctx.message.delete()
 
+        state = guild_states.get(ctx.guild.id)
+        if state.servers.get(name):
+            await ctx.send(f"❌ Υπάρχει ήδη server με το όνομα {name}.")
+            return
+
         premium = image is not None
-        votes = load_votes()
-        servers = load_servers()
 
         new_server = {
+            "id": guild_states.next_server_id(),
             "name": name,
             "chronicle": chronicle,
             "rates": rates,
@@ -90,74 +79,99 @@ class AdminCog(commands.Cog):
             new_server["image"] = image
 
         embed = generate_embed(new_server, context="serverlist")
-        channel = discord.utils.get(ctx.guild.text_channels, name="📜︱server-list")
+        channel = state.channel(ctx.guild, "server_list_channel")
         if not channel:
-            await ctx.send("❌ Δεν βρέθηκε το κανάλι 📜︱server-list.")
+            await ctx.send(f"❌ Δεν βρέθηκε το κανάλι {state.config['server_list_channel']}.")
             return
 
-        message = await channel.send(embed=embed, view=VoteView(name))
+        message = await channel.send(embed=embed, view=VoteView(new_server["id"]))
         new_server["message_id"] = message.id
 
-        servers.append(new_server)
-        votes[name] = {"total": 0, "by_day": {}}
-        save_votes(votes)
-        save_servers(servers)
+        # Το add ενημερώνει και τα indexes του registry
+        state.votes.ensure_server(new_server["id"])
+        state.servers.add(new_server)
+        state.ranking.invalidate()
+        # Το κουμπί πιάνεται ήδη από το dynamic VoteButton, δεν χρειάζεται add_view
+
+    @commands.command()
+    @commands.has_permissions(administrator=True)
+    async def renameserver(self, ctx, old_name, new_name):
+        state = guild_states.get(ctx.guild.id)
+        server = state.servers.get(old_name)
+        if not server:
+            await ctx.send(f"❌ Δεν βρέθηκε server με το όνομα {old_name}.")
+            return
+        existing = state.servers.get(new_name)
+        if existing and existing is not server:
+            await ctx.send(f"❌ Υπάρχει ήδη server με το όνομα {new_name}.")
+            return
 
-        # Προσθήκη View για μελλοντικό restart
-        self.bot.add_view(VoteView(name))
+        # Ψήφοι και κουμπιά μένουν στο ίδιο id, αλλάζουν μόνο τα embeds
+        state.servers.rename(server, new_name)
+        state.ranking.invalidate()
+        vote_pipeline.refresh_embeds(ctx.guild, server)
+        await ctx.send(f"✅ Ο server {old_name} μετονομάστηκε σε {new_name}.")
 
     @commands.command(name="checkinvites")
     @commands.has_permissions(administrator=True)
-    async def check_invites(self, ctx):
-        with open("servers.json", "r", encoding="utf-8") as f:
-            servers = json.load(f)
+    async def check_invites(self, ctx, mode: str = None):
+        servers = guild_states.get(ctx.guild.id).servers.all()
+
+        # "!checkinvites fresh" αγνοεί την cache και ξαναελέγχει όλα τα links
+        results = await self.link_checker.check_many(
+            (server.get("discord") for server in servers),
+            use_cache=(mode != "fresh")
+        )
 
         invalid = []
 
         for server in servers:
-            name = server["name"]
             invite = server.get("discord")
-            if not invite:
-                continue
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(invite) as resp:
-                        if resp.status != 200:
-                            invalid.append(f"❌ {name} – Invalid: {invite}")
-            except Exception:
-                invalid.append(f"❌ {name} – Invalid: {invite}")
+            if invite and not results[invite]["ok"]:
+                invalid.append(f"❌ {server['name']} – Invalid: {invite}")
 
         if not invalid:
             await ctx.send("✅ Όλα τα invite links είναι έγκυρα.", ephemeral=True)
             return
 
-        # Σπάσιμο embed αν ξεπερνάμε το όριο
-        MAX_CHARS = 3900
-        current = ""
-        embeds = []
-
-        for line in invalid:
-            if len(current) + len(line) > MAX_CHARS:
-                embed = discord.Embed(
-                    title="❌ Invalid Invite Links",
-                    description=current,
-                    color=discord.Color.red()
-                )
-                embeds.append(embed)
-                current = ""
-            current += line + "\n"
-
-        if current:
-            embed = discord.Embed(
-                title="❌ Invalid Invite Links",
-                description=current,
-                color=discord.Color.red()
-            )
-            embeds.append(embed)
-
+        embeds = chunk_embeds(invalid, "❌ Invalid Invite Links", discord.Color.red())
         for embed in embeds:
             await ctx.send(embed=embed, ephemeral=True)
 
+    @commands.command(name="guildconfig")
+    @commands.has_permissions(administrator=True)
+    async def guild_config(self, ctx, key: str = None, *, value: str = None):
+        # "!guildconfig" δείχνει τις ρυθμίσεις, "!guildconfig <key> <value>" αλλάζει μία
+        state = guild_states.get(ctx.guild.id)
+        if key is None:
+            await ctx.send("\n".join(f"• {k}: {v}" for k, v in state.config.items()))
+            return
+        if key not in DEFAULT_CONFIG or value is None:
+            await ctx.send(f"❌ Χρήση: !guildconfig <{'|'.join(DEFAULT_CONFIG)}> <value>")
+            return
+        try:
+            state.set_config(key, parse_config_value(key, value))
+        except ValueError:
+            await ctx.send(f"❌ Μη έγκυρη τιμή για {key}: {value}")
+            return
+        await ctx.send(f"✅ {key} = {state.config[key]}")
+
+    @commands.command(name="queuestats")
+    @commands.has_permissions(administrator=True)
+    async def queue_stats(self, ctx):
+        metrics = dispatcher.metrics()
+        lines = [
+            f"📬 Queue depth: {metrics['queue_depth']}",
+            f"✅ Completed: {metrics['completed']} • ❌ Failed: {metrics['failed']}",
+            f"🔁 Coalesced: {metrics['coalesced']} • Retried: {metrics['retried']} • Throttled: {metrics['throttled']}",
+        ]
+        for lane, data in metrics["lanes"].items():
+            lines.append(
+                f"• {lane}: {data['count']} jobs, avg wait {data['avg_wait'] * 1000:.0f} ms, "
+                f"max {data['max_wait'] * 1000:.0f} ms"
+            )
+        await ctx.send("\n".join(lines))
+
 
 async def setup(bot):
     await bot.add_cog(AdminCog(bot))
@@ -0,0 +1,53 @@
+import discord
+from discord.ext import commands
+
+from analytics import vote_rollups, MAX_BUCKETS
+from guilds import guild_states
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+DEFAULT_BUCKETS = {"hour": 24, "day": 30, "month": 12}
+
+
+def sparkline(values) -> str:
+    peak = max(values)
+    if not peak:
+        return SPARK_CHARS[0] * len(values)
+    return "".join(SPARK_CHARS[round(v / peak * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+class AnalyticsCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.command(name="trend")
+    @commands.has_permissions(administrator=True)
+    async def trend(self, ctx, name: str, granularity: str = "day", count: int = None):
+        # "!trend <server> [hour|day|month] [πλήθος]" – μόνο από τα rollups
+        granularity = granularity.lower().rstrip("s")
+        if granularity not in MAX_BUCKETS:
+            await ctx.send("❌ Χρήση: !trend <server> [hour|day|month] [πλήθος]")
+            return
+
+        server = guild_states.get(ctx.guild.id).servers.get(name)
+        if not server:
+            await ctx.send(f"❌ Δεν βρέθηκε server με το όνομα {name}.")
+            return
+
+        series = await vote_rollups.series(server["id"], granularity, count or DEFAULT_BUCKETS[granularity])
+        values = [v for _, v in series]
+        total = sum(values)
+        peak_label, peak = max(series, key=lambda item: item[1])
+
+        embed = discord.Embed(
+            title=f"📈 {server['name']} – votes per {granularity}",
+            description=f"```\n{sparkline(values)}\n```{series[0][0]} → {series[-1][0]}",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Total", value=str(total))
+        embed.add_field(name="Average", value=f"{total / len(values):.1f}")
+        embed.add_field(name="Peak", value=f"{peak} ({peak_label})" if peak else "0")
+        await ctx.send(embed=embed)
+
+
+async def setup(bot):
+    await bot.add_cog(AnalyticsCog(bot))
@@ -1,199 +1,277 @@
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import datetime
-from zoneinfo import ZoneInfo
-import json
-import os
-from utils import generate_embed
+from utils import generate_embed, render_hash
 from views import VoteView
-
-LEADERBOARD_FILE = "leaderboard.json"
-VOTES_FILE = "votes.json"
-SERVERS_FILE = "servers.json"
-LEADERBOARD_CHANNEL_NAME = "🥇︱leaderboards"
-
-def load_votes():
-    if os.path.exists(VOTES_FILE):
-        with open(VOTES_FILE, "r") as f:
-            content = f.read().strip()
-            if content:
-                return json.loads(content)
-    return {}
-
-def save_votes(votes):
-    with open(VOTES_FILE, "w") as f:
-        json.dump(votes, f)
-
-def load_servers():
-    if os.path.exists(SERVERS_FILE):
-        with open(SERVERS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def save_servers(servers):
-    with open(SERVERS_FILE, "w") as f:
-        json.dump(servers, f, indent=2)
-
-def save_leaderboard_message_id(message_id):
-    with open(LEADERBOARD_FILE, "w") as f:
-        json.dump({"message_id": message_id}, f)
-
-def load_leaderboard_message_id():
-    if os.path.exists(LEADERBOARD_FILE):
-        with open(LEADERBOARD_FILE, "r") as f:
-            return json.load(f).get("message_id")
-    return None
+from db import db, set_meta_sql
+from persistence import write_behind
+from dispatch import edit_message, send_message
+from guilds import guild_states
+from pipeline import assign_slots
+from archive import leaderboard_archive, previous_month, parse_month
+from utils import chunk_embeds
+from scheduler import scheduler, Daily, Monthly, ATHENS
+import asyncio
 
 class LeaderboardCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.last_refresh_date = None
-        self.last_reset_date = None
-        self.VOTER_ROLE_NAME = "✅ Voter"
 
 
     # ------------------ PRIVATE REFRESH FUNCTION ------------------
-    async def _refresh_leaderboard(self, guild, channel):
-        try:
-            await channel.purge()
-            all_servers = load_servers()
-            all_votes = load_votes()
-
-            # Ενημέρωση ψήφων
-            for s in all_servers:
-                s["votes"] = all_votes.get(s["name"], {}).get("total", 0)
+    def _build_ranking(self, state):
+        all_servers = state.servers.all()
 
-            premium_servers = [s for s in all_servers if s.get("premium")]
-            non_premium_servers = [s for s in all_servers if not s.get("premium")]
+        # Ενημέρωση ψήφων
+        for s in all_servers:
+            s["votes"] = state.votes.total(s["id"])
 
-            sorted_non_premiums = sorted(
-                non_premium_servers, key=lambda x: (-x["votes"], x["name"].lower())
-            )
+        # Πλήρες rebuild του ranking· οι ψήφοι το ενημερώνουν μετά incrementally
+        state.ranking.rebuild(all_servers)
+        premium_servers = [s for s in all_servers if s.get("premium")]
 
-            for idx, server in enumerate(sorted_non_premiums):
-                server["rank"] = idx + 1
+        sorted_non_premiums = state.ranking.ranked()
+        sorted_non_premiums.reverse()
+        return sorted_non_premiums + premium_servers
 
-            sorted_non_premiums.reverse()
-            final_list = sorted_non_premiums + premium_servers
+    async def _refresh_leaderboard(self, guild, channel, force=False) -> bool:
+        state = guild_states.get(guild.id)
+        try:
+            final_list = self._build_ranking(state)
 
-            # Αποστολή embeds
-            for server in final_list:
-                embed = generate_embed(server, context="leaderboard")
-                message = await channel.send(embed=embed)
-                server["leaderboard_message_id"] = message.id
+            # Τα snowflake IDs αυξάνονται με τον χρόνο, άρα η ταξινόμηση
+            # δίνει τη σειρά των μηνυμάτων μέσα στο κανάλι.
+            slots = sorted(state.servers.by_leaderboard_message_id)
 
-            save_servers(all_servers)
+            if force or not slots:
+                await self._rebuild_leaderboard(state, channel, final_list)
+            else:
+                try:
+                    calls = await self._reconcile_leaderboard(state, channel, final_list, slots)
+                except discord.NotFound:
+                    print(f"[{guild.name}] Leaderboard message missing, rebuilding channel")
+                    await self._rebuild_leaderboard(state, channel, final_list)
+                else:
+                    print(f"[{guild.name}] Leaderboard reconciled with {calls} API calls")
+
+            # Ψήφοι που ήρθαν όσο περιμέναμε τα edits άλλαξαν το ranking χωρίς
+            # να μετακινήσουν μηνύματα· τότε δεν δίνουμε slots και οι live
+            # αλλαγές θέσης περιμένουν το επόμενο refresh
+            if not assign_slots(state):
+                print(f"[{guild.name}] Ranking changed during refresh, live rank moves paused")
+            state.servers.save()
             print(f"[{datetime.datetime.now()}] Leaderboard refreshed in {guild.name}")
+            return True
 
         except Exception as e:
             print(f"[ERROR] Leaderboard refresh failed: {e}")
+            return False
+
+    async def _rebuild_leaderboard(self, state, channel, final_list):
+        await channel.purge()
+        for server in final_list:
+            embed = generate_embed(server, context="leaderboard")
+            message = await send_message(channel, embed=embed)
+            state.servers.set_leaderboard_message_id(server, message.id)
+            server["leaderboard_hash"] = render_hash(server, "leaderboard")
+
+    async def _reconcile_leaderboard(self, state, channel, final_list, slots):
+        # Συγκρίνουμε κάθε θέση με ό,τι δημοσιεύσαμε τελευταία φορά και
+        # κάνουμε edit μόνο όπου άλλαξε το περιεχόμενο.
+        posted_hashes = {
+            message_id: state.servers.get_by_leaderboard_message_id(message_id).get("leaderboard_hash")
+            for message_id in slots
+        }
+        calls = 0
+        edits = []
+
+        for idx, server in enumerate(final_list):
+            # Το hash βγαίνει από τα πεδία του server, χωρίς να φτιάξουμε embed
+            digest = render_hash(server, "leaderboard")
+
+            if idx < len(slots):
+                message_id = slots[idx]
+                if posted_hashes[message_id] != digest:
+                    embed = generate_embed(server, context="leaderboard")
+                    edits.append((server, digest, edit_message(channel, message_id, embed=embed)))
+                    calls += 1
+                    # Το hash γράφεται μόνο αν πετύχει το edit (παρακάτω)
+                    server["leaderboard_hash"] = None
+                else:
+                    server["leaderboard_hash"] = digest
+            else:
+                embed = generate_embed(server, context="leaderboard")
+                message = await send_message(channel, embed=embed)
+                message_id = message.id
+                calls += 1
+                server["leaderboard_hash"] = digest
+
+            state.servers.set_leaderboard_message_id(server, message_id)
+
+        # Τα edits δεν εξαρτώνται από τη σειρά, οπότε τρέχουν παράλληλα στην ουρά
+        results = await asyncio.gather(*(future for _, _, future in edits), return_exceptions=True)
+        missing = None
+        for (server, digest, _), result in zip(edits, results):
+            if not isinstance(result, Exception):
+                server["leaderboard_hash"] = digest
+            elif isinstance(result, discord.NotFound):
+                missing = result
+            else:
+                # Χωρίς hash, το επόμενο reconcile ξαναδοκιμάζει αυτό το μήνυμα
+                print(f"⚠️ Leaderboard edit failed for {server['name']}: {result}")
+        if missing is not None:
+            raise missing
+
+        # Περισσευούμενα μηνύματα στο τέλος
+        for message_id in slots[len(final_list):]:
+            try:
+                await channel.get_partial_message(message_id).delete()
+                calls += 1
+            except discord.NotFound:
+                pass
+
+        return calls
 
 
     # ------------------ COMMAND ------------------
     @commands.command()
     @commands.has_permissions(administrator=True)
-    async def refreshleaderboard(self, ctx):
-        leaderboard_channel = discord.utils.get(
-            ctx.guild.text_channels, name=LEADERBOARD_CHANNEL_NAME
-        )
+    async def refreshleaderboard(self, ctx, mode: str = None):
+        state = guild_states.get(ctx.guild.id)
+        leaderboard_channel = state.channel(ctx.guild, "leaderboard_channel")
         if not leaderboard_channel:
-            await ctx.send(f"❌ Leaderboard channel '{LEADERBOARD_CHANNEL_NAME}' not found.")
+            await ctx.send(f"❌ Leaderboard channel '{state.config['leaderboard_channel']}' not found.")
             return
 
-        await self._refresh_leaderboard(ctx.guild, leaderboard_channel)
+        # "!refreshleaderboard full" κάνει purge και ξαναστέλνει τα πάντα
+        async with state.lock:
+            await self._refresh_leaderboard(ctx.guild, leaderboard_channel, force=(mode == "full"))
         await ctx.send("✅ Leaderboard refreshed.", delete_after=5)
 
 
-    # ------------------ DAILY LOOP ------------------
-    @tasks.loop(time=datetime.time(hour=6, minute=0, tzinfo=ZoneInfo("Europe/Athens")))
-    async def refresh_leaderboard_daily(self):
-        await self.bot.wait_until_ready()
-        for guild in self.bot.guilds:
-            channel = discord.utils.get(guild.text_channels, name=LEADERBOARD_CHANNEL_NAME)
-            if channel:
-                await self._refresh_leaderboard(guild, channel)
-            else:
-                print(f"[{guild.name}] Leaderboard channel '{LEADERBOARD_CHANNEL_NAME}' not found.")
-            print(f"[{datetime.datetime.now()}] ✅ Daily leaderboard task executed")
+    # ------------------ HISTORY ------------------
+    @commands.group(name="leaderboard", invoke_without_command=True)
+    async def leaderboard(self, ctx):
+        await ctx.send("Χρήση: !leaderboard history <YYYY-MM> ή !leaderboard rank <server>")
 
+    @leaderboard.command(name="history")
+    async def leaderboard_history(self, ctx, month: str):
+        month_key = parse_month(month)
+        snapshot = await leaderboard_archive.get(ctx.guild.id, month_key) if month_key else None
+        if not snapshot:
+            await ctx.send(f"❌ Δεν υπάρχει αρχείο leaderboard για {month}.")
+            return
 
-    # ------------------ RESET VOTES LOOP ------------------
-    @tasks.loop(minutes=10)
-    async def reset_votes_loop(self):
-        now = datetime.datetime.now()
-        today = now.date()
+        lines = [
+            f"**#{rank}** {name} – {votes} votes" if rank else f"💎 {name} – {votes} votes"
+            for _, name, votes, rank in snapshot["servers"]
+        ]
+        for embed in chunk_embeds(lines, f"🏆 Leaderboard {month_key}", discord.Color.gold()):
+            await ctx.send(embed=embed)
+
+    @leaderboard.command(name="rank")
+    async def leaderboard_rank(self, ctx, *, name: str):
+        server = guild_states.get(ctx.guild.id).servers.get(name)
+        if not server:
+            await ctx.send(f"❌ Δεν βρέθηκε server με το όνομα {name}.")
+            return
 
-        if now.day == 1 and self.last_reset_date != today:
-            votes = load_votes()
-            for server_data in votes.values():
-                server_data["total"] = 0
-                server_data["by_day"] = {}
-            save_votes(votes)
+        history = await leaderboard_archive.rank_history(ctx.guild.id, server["id"])
+        if not history:
+            await ctx.send(f"ℹ️ Δεν υπάρχει ιστορικό για τον {server['name']}.")
+            return
 
-            servers = load_servers()
-            for server in servers:
-                server["votes"] = 0
-            save_servers(servers)
+        lines = [
+            f"{month}: #{rank} ({votes} votes)" if rank else f"{month}: 💎 premium ({votes} votes)"
+            for month, rank, votes in history
+        ]
+        for embed in chunk_embeds(lines, f"📊 {server['name']} – rank history", discord.Color.gold()):
+            await ctx.send(embed=embed)
+
+
+    # ------------------ SCHEDULED JOBS ------------------
+    async def _for_each_guild(self, job):
+        # Τα guilds τρέχουν παράλληλα· ένα guild που αποτυγχάνει δεν σταματάει τα άλλα,
+        # αλλά στο τέλος το job αποτυγχάνει ώστε το scheduler να το ξανατρέξει
+        guilds = list(self.bot.guilds)
+        results = await asyncio.gather(*(job(guild) for guild in guilds), return_exceptions=True)
+        failed = []
+        for guild, result in zip(guilds, results):
+            if isinstance(result, Exception):
+                print(f"[{guild.name}] ❌ {job.__name__} failed: {result}")
+                failed.append(guild.name)
+        if failed:
+            raise RuntimeError(f"{job.__name__} failed for: {', '.join(failed)}")
+
+    async def _daily_refresh_guild(self, guild):
+        state = guild_states.get(guild.id)
+        channel = state.channel(guild, "leaderboard_channel")
+        if not channel:
+            print(f"[{guild.name}] Leaderboard channel '{state.config['leaderboard_channel']}' not found.")
+            return
+        async with state.lock:
+            if not await self._refresh_leaderboard(guild, channel):
+                raise RuntimeError("leaderboard refresh failed")
 
-            for guild in self.bot.guilds:
-                channel = discord.utils.get(guild.text_channels, name=LEADERBOARD_CHANNEL_NAME)
-                if channel:
-                    await self._refresh_leaderboard(guild, channel)
+    async def refresh_leaderboard_daily(self):
+        await self._for_each_guild(self._daily_refresh_guild)
+        print(f"[{datetime.datetime.now()}] ✅ Daily leaderboard task executed")
+
+    async def _reset_guild(self, guild):
+        state = guild_states.get(guild.id)
+        now = datetime.datetime.now(ATHENS)
+        reset_key = f"monthly_reset:{guild.id}"
+        async with state.lock:
+            # Σε retry (άλλο guild απέτυχε) τα guilds που έχουν ήδη γίνει reset αυτόν
+            # τον μήνα δεν ξαναμηδενίζονται: θα χάνονταν οι ψήφοι που ήρθαν στο μεταξύ
+            if await db.get_meta(reset_key) != now.strftime("%Y-%m"):
+                # Snapshot της τελικής κατάταξης του μήνα, πριν σβηστούν οι ψήφοι
+                month = previous_month(now)
+                if await leaderboard_archive.snapshot(state, month):
+                    print(f"[{guild.name}] 🗄️ Leaderboard archived for {month}")
+
+                state.votes.reset()
+                for server in state.servers.all():
+                    server["votes"] = 0
+                state.servers.save()
+                state.ranking.invalidate()
+                # Στην ίδια ουρά με το reset, οπότε γράφονται στο ίδιο transaction
+                write_behind.enqueue(*set_meta_sql(reset_key, now.strftime("%Y-%m")))
+
+            channel = state.channel(guild, "leaderboard_channel")
+            if channel and not await self._refresh_leaderboard(guild, channel):
+                raise RuntimeError("leaderboard refresh failed")
 
             # Ενημέρωση των embeds στο 📜︱server-list
-            for guild in self.bot.guilds:
-                list_channel = discord.utils.get(guild.text_channels, name="📜︱server-list")
-                if list_channel:
-                    servers = load_servers()
-                    for server in servers:
-                        try:
-                            message_id = server.get("message_id")
-                            if message_id:
-                                msg = await list_channel.fetch_message(message_id)
-                                embed = generate_embed(server, context="serverlist")
-                                await msg.edit(embed=embed, view=VoteView(server["name"]))
-                        except Exception:
-                            continue
-
-            self.last_reset_date = today
-            print(f"[{datetime.datetime.now()}] ✅ Monthly vote reset task executed")
-
-
-    @reset_votes_loop.before_loop
-    async def before_reset_votes(self):
-        await self.bot.wait_until_ready()
-
-    @tasks.loop(hours=24)
-    async def reset_voter_roles(self):
-        await self.bot.wait_until_ready()
-        for guild in self.bot.guilds:
-            voter_role = discord.utils.get(guild.roles, name=self.VOTER_ROLE_NAME)
-            if not voter_role:
-                continue
-            for member in guild.members:
-                if voter_role in member.roles:
-                    try:
-                        await member.remove_roles(voter_role)
-                        print(f"[{guild.name}] Removed Voter role from {member.display_name}")
-                    except Exception as e:
-                        print(f"[{guild.name}] Error removing role from {member.display_name}: {e}")
-
-
-
-    # ------------------ ON_READY ------------------
-    @commands.Cog.listener()
-    async def on_ready(self):
-        if not self.refresh_leaderboard_daily.is_running():
-            self.refresh_leaderboard_daily.start()
-            print("✅ Started refresh_leaderboard_daily")
-        if not self.reset_votes_loop.is_running():
-            self.reset_votes_loop.start()
-            print("✅ Started reset_votes_loop")
-        if not self.reset_voter_roles.is_running():
-            self.reset_voter_roles.start()
-            print("✅ Started reset_voter_roles")
-
+            list_channel = state.channel(guild, "server_list_channel")
+            if list_channel:
+                edits = [
+                    edit_message(
+                        list_channel, server["message_id"],
+                        embed=generate_embed(server, context="serverlist"),
+                        view=VoteView(server["id"])
+                    )
+                    for server in state.servers.with_message_id()
+                ]
+                await asyncio.gather(*edits, return_exceptions=True)
+
+    async def reset_votes_monthly(self):
+        try:
+            await self._for_each_guild(self._reset_guild)
+        finally:
+            # Το scheduler σημειώνει τον μήνα ως έτοιμο αμέσως μετά: το reset πρέπει να είναι ήδη στη βάση.
+            # Και σε αποτυχία, ώστε τα guilds που πρόλαβαν να έχουν γραμμένο το monthly_reset τους.
+            await write_behind.flush()
+        print(f"[{datetime.datetime.now()}] ✅ Monthly vote reset task executed")
+
+    async def cog_load(self):
+        scheduler.add_job("daily_leaderboard_refresh", self.refresh_leaderboard_daily, Daily(hour=6))
+        scheduler.add_job("monthly_vote_reset", self.reset_votes_monthly, Monthly(day=1))
+        scheduler.start(self.bot)
+
+    async def cog_unload(self):
+        await scheduler.stop()
 
 
 async def setup(bot):
@@ -0,0 +1,112 @@
+import discord
+from discord.ext import commands
+import datetime
+import time
+
+from db import db
+from linkcheck import LinkChecker, cdn_expiry
+from guilds import guild_states
+from scheduler import scheduler, Every
+from utils import chunk_embeds
+
+LINK_FIELDS = ("website", "discord", "thumbnail", "image")
+EXPIRY_WARNING = 3 * 24 * 3600   # ειδοποίηση όταν ένα CDN link λήγει μέσα σε 3 μέρες
+
+
+class LinkHealthCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        # Το cache ζει μόνο όσο το TTL ενός γύρου, ώστε κάθε γύρος να ξαναελέγχει
+        self.link_checker = LinkChecker(ttl=0)
+        self.health = {}   # (server_id, field) -> row dict
+
+    async def cog_load(self):
+        await self.link_checker.start()
+        rows = await db.fetchall(
+            "SELECT server_id, field, url, ok, status, error, latency, expires_at, checked_at FROM link_health"
+        )
+        for server_id, field, url, ok, status, error, latency, expires_at, checked_at in rows:
+            self.health[(server_id, field)] = {
+                "server_id": server_id, "field": field, "url": url, "ok": bool(ok), "status": status,
+                "error": error, "latency": latency, "expires_at": expires_at, "checked_at": checked_at,
+            }
+        scheduler.add_job("monitor_links", self.monitor_links, Every(hours=6))
+        scheduler.start(self.bot)
+
+    async def cog_unload(self):
+        scheduler.remove_job("monitor_links")
+        await self.link_checker.close()
+
+    # ------------------ MONITOR LOOP ------------------
+    async def monitor_links(self):
+        targets = [
+            (server["id"], field, server[field])
+            for state in guild_states.all()
+            for server in state.servers.all()
+            for field in LINK_FIELDS
+            if server.get(field)
+        ]
+        results = await self.link_checker.check_many(url for _, _, url in targets)
+
+        health = {}
+        for server_id, field, url in targets:
+            result = results[url]
+            health[(server_id, field)] = {
+                "server_id": server_id, "field": field, "url": url, "ok": result["ok"],
+                "status": result["status"], "error": result["error"], "latency": result["latency"],
+                "expires_at": cdn_expiry(url), "checked_at": result["checked_at"],
+            }
+        self.health = health
+        await db.run(_save_health, list(health.values()))
+
+        broken = sum(1 for h in health.values() if not h["ok"])
+        print(f"[{datetime.datetime.now()}] 🔗 Link health: {len(health)} links, {broken} broken")
+
+    # ------------------ COMMAND ------------------
+    @commands.command(name="linkhealth")
+    @commands.has_permissions(administrator=True)
+    async def link_health(self, ctx):
+        # Διαβάζει μόνο από την cache, χωρίς κανένα request, για τους servers αυτού του guild.
+        # Το όνομα έρχεται από το registry, οπότε ακολουθεί και τα !renameserver.
+        state = guild_states.get(ctx.guild.id)
+        health = [
+            dict(h, server=server["name"]) for h in self.health.values()
+            if (server := state.servers.get_by_id(h["server_id"]))
+        ]
+        if not health:
+            await ctx.send("⏳ Δεν έχει ολοκληρωθεί ακόμα έλεγχος links.")
+            return
+
+        now = time.time()
+        lines = []
+        for h in sorted(health, key=lambda h: (h["server"].lower(), h["field"])):
+            if not h["ok"]:
+                reason = h["status"] or h["error"]
+                lines.append(f"❌ {h['server']} – {h['field']} ({reason}): {h['url']}")
+            elif h["expires_at"] and h["expires_at"] - now < EXPIRY_WARNING:
+                expiry = "expired" if h["expires_at"] <= now else f"expires <t:{h['expires_at']}:R>"
+                lines.append(f"⏳ {h['server']} – {h['field']} {expiry}")
+
+        last_check = max(h["checked_at"] for h in health)
+        if not lines:
+            await ctx.send(f"✅ Όλα τα links είναι υγιή (τελευταίος έλεγχος <t:{int(last_check)}:R>).")
+            return
+
+        for embed in chunk_embeds(lines, "🔗 Link Health", discord.Color.orange()):
+            embed.set_footer(text="Last check")
+            embed.timestamp = datetime.datetime.fromtimestamp(last_check, tz=datetime.timezone.utc)
+            await ctx.send(embed=embed)
+
+
+def _save_health(conn, rows):
+    with conn:
+        conn.execute("DELETE FROM link_health")
+        conn.executemany(
+            "INSERT INTO link_health(server_id, field, url, ok, status, error, latency, expires_at, checked_at) "
+            "VALUES (:server_id, :field, :url, :ok, :status, :error, :latency, :expires_at, :checked_at)",
+            rows
+        )
+
+
+async def setup(bot):
+    await bot.add_cog(LinkHealthCog(bot))
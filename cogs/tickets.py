@@ -1,43 +1,29 @@
+import os
 import discord
 from discord.ext import commands
-import asyncio
-import json
-import os
-
-TICKETS_FILE = "tickets.json"
-
-def load_tickets():
-    if not os.path.exists(TICKETS_FILE):
-        return []
-    with open(TICKETS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def save_tickets(tickets):
-    with open(TICKETS_FILE, "w", encoding="utf-8") as f:
-        json.dump(tickets, f, indent=4)
-
-def add_ticket(channel_id: int, message_id: int):
-    print(f"DEBUG: Adding ticket {channel_id} / {message_id}")
-    tickets = load_tickets()
-    if not any(t['message_id'] == message_id for t in tickets):
-        tickets.append({"channel_id": channel_id, "message_id": message_id})
-        save_tickets(tickets)
-        print("DEBUG: Ticket saved to tickets.json")
-
-async def reattach_ticket_views(bot):
-    tickets = load_tickets()
+from dispatch import respond
+from guilds import guild_states
+from ticket_store import ticket_registry
+from ticket_actions import ticket_actions, CLOSE, CLOSE_DELAY
+from transcripts import transcript_archive
+from ticket_dashboard import ticket_dashboard
+from scheduler import scheduler, Every
+from utils import chunk_embeds
+
+async def register_ticket_views(bot) -> int:
+    # Μόνο τοπική εγγραφή: το add_view με message_id αρκεί για να πιάνει ξανά
+    # τα κουμπιά μετά από restart, χωρίς fetch/edit σε κάθε μήνυμα
+    await ticket_registry.load()
+    tickets = ticket_registry.all()
     for t in tickets:
-        channel = bot.get_channel(t["channel_id"])
-        if isinstance(channel, discord.TextChannel):
-            try:
-                msg = await channel.fetch_message(t["message_id"])
-                await msg.edit(view=ViewWithClaimClose())
-            except Exception as e:
-                print(f"❌ Failed to reattach ticket {t}: {e}")
+        bot.add_view(ViewWithClaimClose(), message_id=t["message_id"])
+    return len(tickets)
+
+TRANSCRIPT_FILES = 5   # πόσα transcripts επισυνάπτει το !transcript
 
+# Χρήστες που τους φτιάχνεται ticket αυτή τη στιγμή (διπλό κλικ στο dropdown)
+_creating = set()
 
-MODERATOR_ROLE_ID = 1392795214397050971
-ADMIN_USER_ID = 374615142723485698
 
 TICKET_REASONS = {
     "general_support": {"label": "General Support", "emoji": "📌", "description": "Ask for help with general issues or questions about the community."},
@@ -59,12 +45,13 @@ class ClaimButton(discord.ui.Button):
         )
 
     async def callback(self, interaction: discord.Interaction):
-        if not isinstance(interaction.user, discord.Member) or MODERATOR_ROLE_ID not in [role.id for role in interaction.user.roles]:
-            await interaction.response.send_message("Only staff can claim tickets.", ephemeral=True)
+        moderator_role_id = guild_states.get(interaction.guild_id).config["moderator_role_id"]
+        if not isinstance(interaction.user, discord.Member) or moderator_role_id not in [role.id for role in interaction.user.roles]:
+            await respond(interaction, "Only staff can claim tickets.", ephemeral=True)
             return
 
         if interaction.message is None:
-            await interaction.response.send_message("Could not retrieve message context.", ephemeral=True)
+            await respond(interaction, "Could not retrieve message context.", ephemeral=True)
             return
 
         self.disabled = True
@@ -72,12 +59,13 @@ class ClaimButton(discord.ui.Button):
 
         view = self.view
         if view is None:
-            await interaction.response.send_message("Internal error: lost view reference.", ephemeral=True)
+            await respond(interaction, "Internal error: lost view reference.", ephemeral=True)
             return
 
         # Εδώ ΔΕΝ ξαναφτιάχνουμε view – κρατάμε το persistent
         await interaction.message.edit(view=view)
-        await interaction.response.send_message(f"{interaction.user.mention} has claimed this ticket.", ephemeral=False)
+        ticket_registry.claim(interaction.channel_id, interaction.user.id)
+        await respond(interaction, f"{interaction.user.mention} has claimed this ticket.", ephemeral=False)
 
 
 class CloseButton(discord.ui.Button):
@@ -91,14 +79,18 @@ class CloseButton(discord.ui.Button):
 
     async def callback(self, interaction: discord.Interaction):
         if not isinstance(interaction.channel, discord.TextChannel):
-            await interaction.response.send_message("This command must be used in a text channel.", ephemeral=True)
+            await respond(interaction, "This command must be used in a text channel.", ephemeral=True)
+            return
+
+        if ticket_registry.get(interaction.channel.id) and not ticket_registry.begin_close(interaction.channel.id):
+            await respond(interaction, "This ticket is already closing.", ephemeral=True)
             return
 
-        await interaction.response.send_message("This ticket will be closed in 10 seconds...", ephemeral=True)
-        await interaction.channel.send("Closing ticket in 10 seconds...")
+        await respond(interaction, f"This ticket will be closed in {CLOSE_DELAY} seconds...", ephemeral=True)
+        await interaction.channel.send(f"Closing ticket in {CLOSE_DELAY} seconds...")
 
-        await asyncio.sleep(10)
-        await interaction.channel.delete()
+        # Το delete γίνεται από την ουρά του ticket_actions, ώστε να επιβιώνει από restart
+        ticket_actions.schedule(interaction.channel.id, CLOSE, delay=CLOSE_DELAY)
 
 class ViewWithClaimClose(discord.ui.View):
     def __init__(self):
@@ -130,33 +122,43 @@ class TicketDropdown(discord.ui.Select):
     async def callback(self, interaction: discord.Interaction):
         guild = interaction.guild
         if guild is None:
-            await interaction.response.send_message("This command must be used in a server.", ephemeral=True)
+            await respond(interaction, "This command must be used in a server.", ephemeral=True)
             return
 
         if not isinstance(interaction.user, discord.Member):
-            await interaction.response.send_message("This must be used by a server member.", ephemeral=True)
+            await respond(interaction, "This must be used by a server member.", ephemeral=True)
             return
 
         member = interaction.user
-        bot_member = guild.me
         default_role = guild.default_role
-        mod_role = guild.get_role(MODERATOR_ROLE_ID)
+        config = guild_states.get(guild.id).config
+        mod_role = guild.get_role(config["moderator_role_id"])
 
         if not default_role or not mod_role:
-            await interaction.response.send_message("Required roles not found.", ephemeral=True)
+            await respond(interaction, "Required roles not found.", ephemeral=True)
             return
 
-        # Anti-spam: Αν υπάρχει ήδη ticket για τον χρήστη
-        existing = discord.utils.find(
-            lambda c: c.name.startswith(f"ticket-{member.name.lower()}"),
-            guild.text_channels
-        )
-        if existing:
-            await interaction.response.send_message(
-                f"You already have an open ticket: {existing.mention}",
+        # Anti-spam: Αν υπάρχει ήδη ticket για τον χρήστη (O(1) από το registry)
+        existing_id = ticket_registry.owner_ticket(guild.id, member.id)
+        existing = guild.get_channel(existing_id) if existing_id else None
+        if existing_id and existing is None:
+            # Το κανάλι σβήστηκε ενώ το bot ήταν offline
+            ticket_registry.close(existing_id)
+        if existing or (guild.id, member.id) in _creating:
+            await respond(
+                interaction,
+                f"You already have an open ticket: {existing.mention}" if existing else "Your ticket is being created.",
                 ephemeral=True
             )
             return
+        _creating.add((guild.id, member.id))
+        try:
+            await self._create_ticket(interaction, guild, member, default_role, mod_role, config)
+        finally:
+            _creating.discard((guild.id, member.id))
+
+    async def _create_ticket(self, interaction, guild, member, default_role, mod_role, config):
+        bot_member = guild.me
 
         reason_key = self.values[0]
         reason_data = TICKET_REASONS[reason_key]
@@ -186,7 +188,7 @@ class TicketDropdown(discord.ui.Select):
 
         view = ViewWithClaimClose()
         msg = await channel.send(embed=embed, view=view)
-        add_ticket(channel.id, msg.id)  
+        ticket_registry.open(channel, msg.id, member.id, reason_key)
         interaction.client.add_view(view, message_id=msg.id)
 
         # Αν είναι Add Server, στέλνουμε template
@@ -203,7 +205,13 @@ class TicketDropdown(discord.ui.Select):
             )
 
         # DM στον admin
-        admin_user = guild.get_member(ADMIN_USER_ID)
+        # Χωρίς members intent το member cache είναι άδειο, οπότε πάμε από τον user
+        admin_user = interaction.client.get_user(config["admin_user_id"])
+        if admin_user is None:
+            try:
+                admin_user = await interaction.client.fetch_user(config["admin_user_id"])
+            except discord.HTTPException:
+                admin_user = None
         if admin_user:
             try:
                 await admin_user.send(
@@ -213,7 +221,7 @@ class TicketDropdown(discord.ui.Select):
                 print("Cannot send DM to admin.")
 
         # Ephemeral μήνυμα στον χρήστη
-        await interaction.response.send_message(f"Your ticket has been created: {channel.mention}", ephemeral=True)
+        await respond(interaction, f"Your ticket has been created: {channel.mention}", ephemeral=True)
 
 
 
@@ -229,6 +237,35 @@ class tickets(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        scheduler.add_job("prune_tickets", self.prune_tickets, Every(hours=1))
+        scheduler.start(self.bot)
+        ticket_actions.start(self.bot)
+        await ticket_dashboard.start(self.bot)
+
+    async def cog_unload(self):
+        scheduler.remove_job("prune_tickets")
+        await ticket_actions.stop()
+        ticket_dashboard.stop()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        filled = ticket_registry.backfill(self.bot)
+        if filled:
+            print(f"🎫 Βρέθηκε owner για {filled} παλιά tickets")
+        # Ό,τι άλλαξε όσο το bot ήταν offline
+        ticket_dashboard.refresh_all()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        # Και για κανάλια που σβήνονται με το χέρι, όχι μόνο από το Close
+        ticket_registry.close(channel.id)
+
+    async def prune_tickets(self):
+        pruned = ticket_registry.prune(self.bot)
+        if pruned:
+            print(f"🧹 Έκλεισαν {pruned} tickets χωρίς κανάλι")
+
     @commands.command(name="setticket")
     @commands.has_permissions(administrator=True)
     async def setticket(self, ctx):
@@ -251,6 +288,44 @@ class tickets(commands.Cog):
 
         await ctx.send(embed=embed, view=TicketView())
 
+    @commands.command(name="ticketdashboard")
+    @commands.has_permissions(administrator=True)
+    async def ticketdashboard(self, ctx):
+        # Το dashboard μπαίνει στο κανάλι όπου δόθηκε η εντολή (ένα ανά guild)
+        await ticket_dashboard.post(ctx.channel)
+        await ctx.message.delete()
+
+    @commands.command(name="transcript")
+    @commands.has_permissions(administrator=True)
+    async def transcript(self, ctx, target: str, reason: str = None):
+        # !transcript <user> [reason] ή !transcript <reason>: μόνο από το ευρετήριο
+        if target in TICKET_REASONS:
+            user, reason = None, target
+        else:
+            try:
+                user = await commands.UserConverter().convert(ctx, target)
+            except commands.BadArgument:
+                await ctx.send(f"❌ Δεν βρέθηκε χρήστης ή reason '{target}'.")
+                return
+
+        entries = await transcript_archive.find(ctx.guild.id, user.id if user else None, reason, limit=TRANSCRIPT_FILES)
+        if not entries:
+            await ctx.send("ℹ️ Δεν βρέθηκαν transcripts.")
+            return
+
+        lines = [
+            f"`{e['channel_name']}` – {TICKET_REASONS.get(e['reason'], {}).get('label', e['reason'] or '?')} – "
+            f"<t:{int(e['closed_at'])}:f> – {e['messages']} messages"
+            + ("" if user else f" – <@{e['owner_id']}>" if e["owner_id"] else "")
+            for e in entries
+        ]
+        files = [
+            discord.File(transcript_archive.path(e), filename=f"{e['channel_name']}-{e['channel_id']}.jsonl.gz")
+            for e in entries if os.path.exists(transcript_archive.path(e))
+        ]
+        title = f"📜 Transcripts – {user}" if user else f"📜 Transcripts – {reason}"
+        await ctx.send(embed=chunk_embeds(lines, title, discord.Color.dark_red())[0], files=files)
+
 
 
 async def setup(bot):
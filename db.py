@@ -0,0 +1,378 @@
+import asyncio
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+DB_FILE = "lore.db"
+
+# Παλιά JSON αρχεία που μεταφέρονται μία φορά στη βάση
+SERVERS_JSON = "servers.json"
+VOTES_JSON = "votes.json"
+TICKETS_JSON = "tickets.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS servers (
+    id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL DEFAULT 0,
+    name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    message_id INTEGER,
+    leaderboard_message_id INTEGER,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_servers_message ON servers(message_id);
+CREATE INDEX IF NOT EXISTS idx_servers_leaderboard_message ON servers(leaderboard_message_id);
+
+CREATE TABLE IF NOT EXISTS votes (
+    server_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL DEFAULT 0,
+    day TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    PRIMARY KEY (server_id, day, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_votes_day_user ON votes(day, user_id);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    channel_id INTEGER PRIMARY KEY,
+    message_id INTEGER NOT NULL UNIQUE,
+    guild_id INTEGER,
+    owner_id INTEGER,
+    reason TEXT,
+    created_at REAL,
+    claimed_by INTEGER,
+    status TEXT NOT NULL DEFAULT 'open',
+    closed_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS link_health (
+    server_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    url TEXT NOT NULL,
+    ok INTEGER NOT NULL,
+    status INTEGER,
+    error TEXT,
+    latency REAL,
+    expires_at INTEGER,
+    checked_at REAL NOT NULL,
+    PRIMARY KEY (server_id, field)
+);
+
+CREATE TABLE IF NOT EXISTS role_grants (
+    guild_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    granted_at REAL NOT NULL,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_role_grants_granted ON role_grants(granted_at);
+
+CREATE TABLE IF NOT EXISTS transcripts (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    owner_id INTEGER,
+    reason TEXT,
+    channel_name TEXT,
+    closed_at REAL NOT NULL,
+    digest TEXT NOT NULL,
+    messages INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transcripts_owner ON transcripts(guild_id, owner_id, closed_at);
+CREATE INDEX IF NOT EXISTS idx_transcripts_reason ON transcripts(guild_id, reason, closed_at);
+
+CREATE TABLE IF NOT EXISTS ticket_actions (
+    channel_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    due_at REAL NOT NULL,
+    PRIMARY KEY (channel_id, action)
+);
+
+CREATE TABLE IF NOT EXISTS scheduler_jobs (
+    name TEXT PRIMARY KEY,
+    last_period TEXT NOT NULL,
+    last_run REAL
+);
+
+CREATE TABLE IF NOT EXISTS vote_rollups (
+    server_id INTEGER NOT NULL,
+    granularity TEXT NOT NULL,
+    start TEXT NOT NULL,
+    counts BLOB NOT NULL,
+    PRIMARY KEY (server_id, granularity, start)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS leaderboard_archive (
+    guild_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (guild_id, month)
+);
+
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+-- seq του vote journal που γράφτηκαν πάνω από το journal_applied_seq (βλ. journal.py)
+CREATE TABLE IF NOT EXISTS journal_applied (
+    seq INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class Database:
+    # Όλη η πρόσβαση στη sqlite γίνεται από ένα αφιερωμένο thread,
+    # ώστε το event loop να μη μπλοκάρει ποτέ σε I/O.
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self._conn = None
+        self._closed = False
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            migrate_server_ids(self._conn)
+            migrate_guild_partitions(self._conn)
+            migrate_ticket_owners(self._conn)
+            migrate_link_health(self._conn)
+            if get_meta(self._conn, "json_imported") is None:
+                import_json_files(self._conn)
+        return self._conn
+
+    def _run(self, fn, *args):
+        return fn(self._connect(), *args)
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run, fn, *args)
+
+    def call(self, fn, *args):
+        # Σύγχρονη κλήση (μόνο για φόρτωμα στην εκκίνηση ή scripts)
+        return self._executor.submit(self._run, fn, *args).result()
+
+    async def fetchall(self, sql, params=()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    def fetchall_sync(self, sql, params=()):
+        return self.call(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def execute(self, sql, params=()):
+        def _execute(conn):
+            with conn:
+                conn.execute(sql, params)
+        await self.run(_execute)
+
+    async def get_meta(self, key, default=None):
+        return await self.run(get_meta, key, default)
+
+    async def set_meta(self, key, value):
+        def _set(conn):
+            with conn:
+                set_meta(conn, key, value)
+        await self.run(_set)
+
+    def close(self):
+        def _close(conn):
+            conn.close()
+        if self._closed:
+            return
+        self._closed = True
+        if self._conn is not None:
+            self.call(_close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return json.loads(row[0]) if row else default
+
+
+def set_meta_sql(key, value):
+    # (sql, params) για το write-behind, ώστε ένα meta να γράφεται μαζί με άλλες αλλαγές
+    return (
+        "INSERT INTO meta(key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, json.dumps(value))
+    )
+
+
+def set_meta(conn, key, value):
+    conn.execute(*set_meta_sql(key, value))
+
+
+def upsert_server_sql(server: dict, guild_id: int = 0):
+    return (
+        "INSERT INTO servers(id, guild_id, name, position, message_id, leaderboard_message_id, data) "
+        "VALUES (?, ?, ?, COALESCE((SELECT MAX(position) + 1 FROM servers), 0), ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET guild_id = excluded.guild_id, name = excluded.name, "
+        "message_id = excluded.message_id, "
+        "leaderboard_message_id = excluded.leaderboard_message_id, data = excluded.data",
+        (
+            server["id"],
+            guild_id,
+            server["name"],
+            server.get("message_id"),
+            server.get("leaderboard_message_id"),
+            json.dumps(server),
+        )
+    )
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _vote_rows(votes_by_name, ids_by_name):
+    # Οι ψήφοι περνάνε από όνομα σε server id· όσες ανήκουν σε server
+    # που δεν υπάρχει πια στη λίστα δεν μεταφέρονται
+    rows, orphaned = [], 0
+    for server_name, day, user_id in votes_by_name:
+        server_id = ids_by_name.get(server_name.strip().casefold())
+        if server_id is None:
+            orphaned += 1
+            continue
+        rows.append((server_id, day, user_id))
+    return rows, orphaned
+
+
+def migrate_server_ids(conn):
+    # Παλιά βάση: servers και votes είχαν κλειδί το όνομα του server.
+    # Κάθε server παίρνει σταθερό ακέραιο id και οι ψήφοι ξανακλειδώνονται σε αυτό.
+    if "id" in _columns(conn, "servers"):
+        return
+
+    conn.execute("BEGIN")
+    try:
+        servers = conn.execute("SELECT data FROM servers ORDER BY position").fetchall()
+        old_votes = conn.execute("SELECT server, day, user_id FROM votes").fetchall()
+        conn.execute("DROP TABLE servers")
+        conn.execute("DROP TABLE votes")
+        for statement in SCHEMA.split(";"):
+            if statement.strip():
+                conn.execute(statement)
+
+        ids_by_name = {}
+        for server_id, (data,) in enumerate(servers, start=1):
+            server = json.loads(data)
+            server["id"] = server_id
+            ids_by_name[server["name"].strip().casefold()] = server_id
+            conn.execute(*upsert_server_sql(server))
+
+        rows, orphaned = _vote_rows(old_votes, ids_by_name)
+        conn.executemany("INSERT OR IGNORE INTO votes(server_id, day, user_id) VALUES (?, ?, ?)", rows)
+        set_meta(conn, "vote_buttons_rekey_pending", True)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    print(f"🔢 Server ids: {len(servers)} servers, {len(rows)} votes μεταφέρθηκαν ({orphaned} χωρίς server)")
+
+
+def migrate_guild_partitions(conn):
+    # Κάθε guild έχει δικούς του servers και ψήφους. Τα υπάρχοντα δεδομένα
+    # μένουν στο guild_id 0 μέχρι να τα υιοθετήσει το guild στο on_ready.
+    with conn:
+        for table in ("servers", "votes"):
+            if "guild_id" not in _columns(conn, table):
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN guild_id INTEGER NOT NULL DEFAULT 0")
+        conn.execute("DROP INDEX IF EXISTS idx_servers_name_nocase")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_servers_guild_name ON servers(guild_id, name COLLATE NOCASE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_votes_guild_day ON votes(guild_id, day, user_id)")
+
+
+def migrate_ticket_owners(conn):
+    # Τα παλιά tickets δεν έχουν owner: συμπληρώνεται στο startup από τα permissions του καναλιού
+    with conn:
+        existing = _columns(conn, "tickets")
+        for column, kind in (("guild_id", "INTEGER"), ("owner_id", "INTEGER"), ("reason", "TEXT"),
+                             ("created_at", "REAL"), ("claimed_by", "INTEGER"),
+                             ("status", "TEXT NOT NULL DEFAULT 'open'"), ("closed_at", "REAL")):
+            if column not in existing:
+                conn.execute(f"ALTER TABLE tickets ADD COLUMN {column} {kind}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_owner ON tickets(guild_id, owner_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status, closed_at)")
+
+
+def migrate_link_health(conn):
+    # Ο παλιός πίνακας είχε κλειδί το όνομα του server (συγκρούσεις ανάμεσα σε guilds).
+    # Είναι μόνο cache που ξαναγράφεται σε κάθε γύρο ελέγχου, οπότε απλώς ξαναφτιάχνεται.
+    if "server_id" in _columns(conn, "link_health"):
+        return
+    with conn:
+        conn.execute("DROP TABLE link_health")
+        conn.execute(
+            "CREATE TABLE link_health (server_id INTEGER NOT NULL, field TEXT NOT NULL, url TEXT NOT NULL, "
+            "ok INTEGER NOT NULL, status INTEGER, error TEXT, latency REAL, expires_at INTEGER, "
+            "checked_at REAL NOT NULL, PRIMARY KEY (server_id, field))"
+        )
+
+
+def _read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read().strip()
+    return json.loads(content) if content else default
+
+
+def import_json_files(conn, directory="."):
+    # One-shot μεταφορά των παλιών JSON αρχείων στη βάση
+    servers = _read_json(os.path.join(directory, SERVERS_JSON), [])
+    votes = _read_json(os.path.join(directory, VOTES_JSON), {})
+    tickets = _read_json(os.path.join(directory, TICKETS_JSON), [])
+
+    with conn:
+        next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM servers").fetchone()[0]
+        ids_by_name = {
+            name.strip().casefold(): server_id for server_id, name in conn.execute("SELECT id, name FROM servers")
+        }
+        for server in servers:
+            key = server["name"].strip().casefold()
+            if key not in ids_by_name:
+                ids_by_name[key] = next_id
+                next_id += 1
+            server["id"] = ids_by_name[key]
+            conn.execute(*upsert_server_sql(server))
+
+        rows, _ = _vote_rows(
+            (
+                (server_name, day, user_id)
+                for server_name, data in votes.items()
+                for day, user_ids in data.get("by_day", {}).items()
+                for user_id in user_ids
+            ),
+            ids_by_name
+        )
+        conn.executemany("INSERT OR IGNORE INTO votes(server_id, day, user_id) VALUES (?, ?, ?)", rows)
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO tickets(channel_id, message_id) VALUES (?, ?)",
+            [(t["channel_id"], t["message_id"]) for t in tickets]
+        )
+
+        # Τα μηνύματα από τα JSON έχουν ακόμα κουμπιά vote_<όνομα>
+        if servers:
+            set_meta(conn, "vote_buttons_rekey_pending", True)
+
+        set_meta(conn, "json_imported", True)
+
+    print(f"📦 Μεταφέρθηκαν στη βάση: {len(servers)} servers, {len(votes)} vote ledgers, {len(tickets)} tickets")
+
+
+db = Database()
+
+
+if __name__ == "__main__":
+    # python db.py -> ξανατρέχει χειροκίνητα τη μεταφορά από τα JSON
+    db.call(import_json_files)
+    db.close()
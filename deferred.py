@@ -0,0 +1,103 @@
+import asyncio
+import heapq
+import time
+
+from db import db
+from persistence import write_behind
+
+
+class DeferredQueue:
+    # Μόνιμη ουρά για ενέργειες που πρέπει να γίνουν σε συγκεκριμένη ώρα.
+    # Κάθε εγγραφή είναι μια γραμμή σε έναν πίνακα: τα key_columns (primary key)
+    # και το stamp_column, που ξεχωρίζει μια εγγραφή από μια νεότερη με το ίδιο key.
+    # Η ώρα εκτέλεσης βγαίνει από το stamp (due), οπότε μετά από restart το heap
+    # ξαναχτίζεται από τη βάση. Ένα task εξυπηρετεί όλες τις εγγραφές.
+    def __init__(self, table: str, key_columns: tuple, stamp_column: str, due=lambda stamp: stamp, database=db):
+        self.table = table
+        self.key_columns = key_columns
+        self.stamp_column = stamp_column
+        self.due = due
+        self.db = database
+        self.entries = {}   # key -> stamp
+        self._heap = []     # (due_at, key, stamp)
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    async def load(self):
+        rows = await self.db.fetchall(
+            f"SELECT {', '.join(self.key_columns)}, {self.stamp_column} FROM {self.table}"
+        )
+        # Ό,τι μπήκε πριν το load (π.χ. ψήφοι στο startup) είναι νεότερο από τη βάση
+        self.entries = {**{tuple(row[:-1]): row[-1] for row in rows}, **self.entries}
+        self._heap = [(self.due(stamp), key, stamp) for key, stamp in self.entries.items()]
+        heapq.heapify(self._heap)
+
+    def put(self, key: tuple, stamp: float):
+        self.entries[key] = stamp
+        self._push(self.due(stamp), key, stamp)
+        columns = (*self.key_columns, self.stamp_column)
+        write_behind.enqueue(
+            f"INSERT INTO {self.table}({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT({', '.join(self.key_columns)}) DO UPDATE SET "
+            f"{self.stamp_column} = excluded.{self.stamp_column}",
+            (*key, stamp)
+        )
+
+    def retry(self, key: tuple, stamp: float, delay: float):
+        # Η εγγραφή μένει ίδια (και στη βάση), απλώς ξαναμπαίνει στο heap
+        if self.entries.get(key) == stamp:
+            self._push(time.time() + delay, key, stamp)
+
+    def done(self, key: tuple, stamp: float):
+        # Με το stamp στο WHERE δεν σβήνουμε μια νεότερη εγγραφή με το ίδιο key
+        if self.entries.get(key) == stamp:
+            del self.entries[key]
+        write_behind.enqueue(
+            f"DELETE FROM {self.table} WHERE "
+            f"{' AND '.join(f'{c} = ?' for c in self.key_columns)} AND {self.stamp_column} = ?",
+            (*key, stamp)
+        )
+
+    def _push(self, due_at: float, key: tuple, stamp: float):
+        # Ξυπνάμε το task μόνο αν η νέα εγγραφή είναι πιο κοντά από την επόμενη
+        if not self._heap or due_at < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (due_at, key, stamp))
+
+    def start(self, fire, setup=None):
+        # fire(due) παίρνει λίστα από (key, stamp) και αποφασίζει για καθένα done/retry/put
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(fire, setup))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, fire, setup):
+        await self.load()
+        if setup is not None:
+            await setup()
+
+        while True:
+            now = time.time()
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                _, key, stamp = heapq.heappop(self._heap)
+                # Παλιές εγγραφές (το key ξαναμπήκε με νεότερο stamp) αγνοούνται
+                if self.entries.get(key) == stamp:
+                    due.append((key, stamp))
+
+            if due:
+                try:
+                    await fire(due)
+                except Exception as e:
+                    print(f"❌ Σφάλμα στην ουρά {self.table}: {e}")
+
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
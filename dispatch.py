@@ -0,0 +1,262 @@
+import asyncio
+import itertools
+import time
+
+import discord
+
+# Lanes: μικρότερος αριθμός = μεγαλύτερη προτεραιότητα. Οι απαντήσεις σε
+# interactions δεν περνάνε από την ουρά (βλ. respond).
+NORMAL = 0       # live updates μετά από ψήφο
+BACKGROUND = 1   # refresh/setup/reset και γενικά bulk δουλειές
+
+LANE_NAMES = {NORMAL: "normal", BACKGROUND: "background"}
+
+WORKERS = 4
+RETRY_BACKOFF = 2.0
+
+# Όριο ανά route: (χωρητικότητα, tokens ανά δευτερόλεπτο).
+# Το Discord επιτρέπει περίπου 5 μηνύματα / 5s ανά κανάλι.
+ROUTE_LIMITS = {
+    "channel": (5, 1.0),
+    "guild": (10, 2.0),
+}
+
+
+class TokenBucket:
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        # Επιστρέφει 0 αν πήραμε token, αλλιώς πόσο να περιμένουμε
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Job:
+    def __init__(self, action, route, priority, key, retries, fields=None):
+        self.action = action        # callable(**fields) που επιστρέφει coroutine
+        self.fields = fields or {}
+        self.route = route
+        self.priority = priority
+        self.key = key
+        self.retries = retries
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+        self.started = False
+
+
+class Dispatcher:
+    # Κεντρική ουρά για όλα τα εξερχόμενα API calls του bot
+    def __init__(self, workers=WORKERS):
+        self.worker_count = workers
+        self._queue = None
+        self._workers = []
+        self._seq = itertools.count()
+        self._pending = {}   # coalescing key -> Job που δεν έχει ξεκινήσει
+        self._latest = {}    # coalescing key -> το πιο πρόσφατο Job, ακόμα κι αν τελείωσε
+        self._unresolved = {}  # coalescing key -> πόσα jobs με αυτό το key δεν έχουν τελειώσει
+        self._buckets = {}
+        self.stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+            "retried": 0,
+            "throttled": 0,
+        }
+        self.wait_times = {lane: {"count": 0, "total": 0.0, "max": 0.0} for lane in LANE_NAMES}
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+            self._workers = [
+                asyncio.get_running_loop().create_task(self._worker())
+                for _ in range(self.worker_count)
+            ]
+
+    def submit(self, action, *, route=None, priority=BACKGROUND, key=None, retries=0, fields=None) -> asyncio.Future:
+        self._ensure_started()
+        self.stats["submitted"] += 1
+
+        # Coalescing: αν υπάρχει ήδη job με το ίδιο key που δεν έχει τρέξει,
+        # τα πεδία συγχωνεύονται και τα νεότερα κερδίζουν (π.χ. ένα edit με
+        # view= και ένα μεταγενέστερο με embed= γίνονται ένα edit με τα δύο).
+        if key is not None:
+            job = self._pending.get(key)
+            if job is not None and not job.started:
+                job.action = action
+                job.fields.update(fields or {})
+                job.retries = max(job.retries, retries)
+                if priority < job.priority:
+                    job.priority = priority
+                    self._put(job)
+                self.stats["coalesced"] += 1
+                return job.future
+
+        job = Job(action, route, priority, key, retries, dict(fields or {}))
+        if key is not None:
+            self._pending[key] = job
+            self._latest[key] = job
+            self._unresolved[key] = self._unresolved.get(key, 0) + 1
+            job.future.add_done_callback(lambda _, k=key: self._release(k))
+        self._put(job)
+        return job.future
+
+    def _put(self, job):
+        self._queue.put_nowait((job.priority, next(self._seq), job))
+
+    def _release(self, key):
+        # Το _latest κρατιέται όσο υπάρχει job με αυτό το key που μπορεί να ξαναδοκιμάσει
+        self._unresolved[key] -= 1
+        if not self._unresolved[key]:
+            del self._unresolved[key]
+            self._latest.pop(key, None)
+
+    def _bucket(self, route):
+        if route is None:
+            return None
+        bucket = self._buckets.get(route)
+        if bucket is None:
+            capacity, rate = ROUTE_LIMITS.get(route.split(":", 1)[0], ROUTE_LIMITS["channel"])
+            bucket = self._buckets[route] = TokenBucket(capacity, rate)
+        return bucket
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            priority, _, job = await self._queue.get()
+            try:
+                # Ένα job μπορεί να υπάρχει δύο φορές στην ουρά αν ανέβηκε lane
+                if job.started or job.future.done() or priority != job.priority:
+                    continue
+
+                bucket = self._bucket(job.route)
+                delay = bucket.take() if bucket else 0.0
+                if delay > 0:
+                    # Δεν κρατάμε τον worker: το job ξαναμπαίνει όταν θα υπάρχει token
+                    self.stats["throttled"] += 1
+                    loop.call_later(delay, self._put, job)
+                    continue
+
+                job.started = True
+                if job.key is not None and self._pending.get(job.key) is job:
+                    del self._pending[job.key]
+                self._record_wait(job)
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _record_wait(self, job):
+        waited = time.monotonic() - job.enqueued
+        lane = self.wait_times[job.priority]
+        lane["count"] += 1
+        lane["total"] += waited
+        lane["max"] = max(lane["max"], waited)
+
+    async def _run(self, job):
+        try:
+            result = await job.action(**job.fields)
+        except (discord.NotFound, discord.Forbidden) as e:
+            self.stats["failed"] += 1
+            job.future.set_exception(e)
+        except Exception as e:
+            if job.retries > 0 and _is_retryable(e):
+                self.stats["retried"] += 1
+                newer = self._latest.get(job.key) if job.key is not None else None
+                if newer is not None and newer is not job:
+                    # Ήρθε νεότερο job για το ίδιο key όσο έτρεχε αυτό: τα δικά
+                    # μας πεδία είναι παλιά, οπότε δεν ξαναστέλνονται
+                    _chain(newer.future, job.future)
+                    return
+                job.retries -= 1
+                job.started = False
+                if job.key is not None:
+                    # Ξανά στο _pending ώστε ένα νεότερο edit να συγχωνευτεί σε αυτό
+                    self._pending[job.key] = job
+                asyncio.get_running_loop().call_later(RETRY_BACKOFF, self._put, job)
+                return
+            self.stats["failed"] += 1
+            job.future.set_exception(e)
+        else:
+            self.stats["completed"] += 1
+            job.future.set_result(result)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def metrics(self) -> dict:
+        lanes = {}
+        for lane, data in self.wait_times.items():
+            avg = data["total"] / data["count"] if data["count"] else 0.0
+            lanes[LANE_NAMES[lane]] = {"count": data["count"], "avg_wait": avg, "max_wait": data["max"]}
+        return {"queue_depth": self.queue_depth(), **self.stats, "lanes": lanes}
+
+    async def close(self):
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+
+def _chain(source: asyncio.Future, target: asyncio.Future):
+    def callback(future):
+        if target.done():
+            return
+        if future.cancelled():
+            target.cancel()
+        elif future.exception() is not None:
+            target.set_exception(future.exception())
+        else:
+            target.set_result(future.result())
+    source.add_done_callback(callback)
+
+
+def _is_retryable(error) -> bool:
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, OSError))
+
+
+def channel_route(channel) -> str:
+    return f"channel:{channel.id}"
+
+
+dispatcher = Dispatcher()
+
+
+def edit_message(channel, message_id: int, *, priority=BACKGROUND, retries=1, **fields) -> asyncio.Future:
+    # Επαναλαμβανόμενα edits στο ίδιο μήνυμα συγχωνεύονται σε ένα
+    message = channel.get_partial_message(message_id)
+    return dispatcher.submit(
+        message.edit,
+        route=channel_route(channel),
+        priority=priority,
+        key=("edit", message_id),
+        retries=retries,
+        fields=fields,
+    )
+
+
+def send_message(channel, *, priority=BACKGROUND, retries=1, **fields) -> asyncio.Future:
+    return dispatcher.submit(
+        lambda: channel.send(**fields),
+        route=channel_route(channel),
+        priority=priority,
+        retries=retries,
+    )
+
+
+async def respond(interaction: discord.Interaction, *args, **kwargs):
+    # Οι απαντήσεις σε interactions στέλνονται αμέσως, όχι από την ουρά: έχουν
+    # προθεσμία 3s και δικό τους rate limit (το interaction token), ενώ οι
+    # workers μπορεί να είναι όλοι κολλημένοι σε 429 από bulk δουλειές
+    await interaction.response.send_message(*args, **kwargs)
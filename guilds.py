@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+
+import discord
+
+from db import db
+from persistence import write_behind
+from ranking import Ranking
+from store import VoteStore, ServerRegistry
+
+LEGACY_GUILD_ID = 0   # δεδομένα από πριν το multi-guild, μέχρι να τα υιοθετήσει ένα guild
+
+# Ρυθμίσεις που μπορεί να αλλάξει κάθε guild με το !guildconfig
+DEFAULT_CONFIG = {
+    "server_list_channel": "📜︱server-list",
+    "leaderboard_channel": "🥇︱leaderboards",
+    "moderator_role_id": 1392795214397050971,
+    "admin_user_id": 374615142723485698,
+}
+INT_CONFIG_KEYS = {"moderator_role_id", "admin_user_id"}
+
+
+class GuildState:
+    # Όλη η κατάσταση ενός guild: servers, ψήφοι, ranking και ρυθμίσεις.
+    # Κάθε guild έχει το δικό του lock, ώστε refresh/reset να μη μπλέκονται μεταξύ τους.
+    def __init__(self, guild_id: int, database=db):
+        self.guild_id = guild_id
+        self.config = dict(DEFAULT_CONFIG)
+        self.servers = ServerRegistry(guild_id, database)
+        self.votes = VoteStore(guild_id, database)
+        self.ranking = Ranking()
+        self.lock = asyncio.Lock()
+
+    async def preload(self):
+        await self.servers.preload()
+        await self.votes.preload()
+
+    def channel(self, guild: discord.Guild, key: str):
+        return discord.utils.get(guild.text_channels, name=self.config[key])
+
+    def set_config(self, key: str, value):
+        self.config[key] = value
+        write_behind.mark_dirty(("guild_config", self.guild_id), self._config_sql)
+
+    def _config_sql(self):
+        overrides = {k: v for k, v in self.config.items() if DEFAULT_CONFIG.get(k) != v}
+        return [(
+            "INSERT INTO guild_config(guild_id, data) VALUES (?, ?) "
+            "ON CONFLICT(guild_id) DO UPDATE SET data = excluded.data",
+            (self.guild_id, json.dumps(overrides))
+        )]
+
+
+class GuildStates:
+    def __init__(self, database=db):
+        self.db = database
+        self.states = {}   # guild_id -> GuildState
+        self._last_server_id = 0
+
+    def get(self, guild_id: int) -> GuildState:
+        state = self.states.get(guild_id)
+        if state is None:
+            state = self.states[guild_id] = GuildState(guild_id, self.db)
+        return state
+
+    def all(self) -> list:
+        return list(self.states.values())
+
+    async def preload(self):
+        # Φορτώνονται όλα τα guilds που έχουν δεδομένα, παράλληλα
+        rows = await self.db.fetchall("SELECT DISTINCT guild_id FROM servers")
+        configs = await self.db.fetchall("SELECT guild_id, data FROM guild_config")
+        for (guild_id,) in rows:
+            self.get(guild_id)
+        for guild_id, data in configs:
+            self.get(guild_id).config.update(json.loads(data))
+        await asyncio.gather(*(state.preload() for state in self.all()))
+
+    def next_server_id(self) -> int:
+        # Τα ids είναι μοναδικά σε όλα τα guilds (servers.id είναι primary key).
+        # Το id δεσμεύεται εδώ, χωρίς await, ώστε δύο !addserver που τρέχουν
+        # ταυτόχρονα (πριν μπει ο πρώτος server στο registry) να μην πάρουν το ίδιο.
+        current = max((max(s.servers.by_id, default=0) for s in self.all()), default=0)
+        self._last_server_id = max(self._last_server_id, current) + 1
+        return self._last_server_id
+
+    def adopt_legacy(self, bot) -> GuildState:
+        # Τα δεδομένα του guild_id 0 πάνε στο LEGACY_GUILD_ID του .env ή,
+        # αν το bot είναι μόνο σε ένα guild, σε αυτό
+        legacy = self.states.get(LEGACY_GUILD_ID)
+        if legacy is None or not legacy.servers.all():
+            return None
+
+        target = int(os.getenv("LEGACY_GUILD_ID") or 0)
+        if not target and len(bot.guilds) == 1:
+            target = bot.guilds[0].id
+        existing = self.states.get(target)
+        if not target or (existing and existing.servers.all()):
+            print("⚠️ Υπάρχουν servers χωρίς guild: ορίστε LEGACY_GUILD_ID στο .env")
+            return None
+
+        del self.states[LEGACY_GUILD_ID]
+        legacy.guild_id = legacy.servers.guild_id = legacy.votes.guild_id = target
+        self.states[target] = legacy
+        write_behind.enqueue("UPDATE servers SET guild_id = ? WHERE guild_id = ?", (target, LEGACY_GUILD_ID))
+        write_behind.enqueue("UPDATE votes SET guild_id = ? WHERE guild_id = ?", (target, LEGACY_GUILD_ID))
+        print(f"🏠 {len(legacy.servers.all())} servers ανατέθηκαν στο guild {target}")
+        return legacy
+
+
+def parse_config_value(key: str, value: str):
+    if key in INT_CONFIG_KEYS:
+        return int(value.strip("<@&#>"))
+    return value
+
+
+guild_states = GuildStates()
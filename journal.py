@@ -0,0 +1,220 @@
+import asyncio
+import datetime
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from analytics import add_to_rollups
+from db import db, get_meta, set_meta
+from persistence import write_behind
+from store import INSERT_VOTE_SQL
+
+JOURNAL_FILE = "votes.journal"
+COMPACT_INTERVAL = 60   # δευτερόλεπτα ανάμεσα στα compactions
+
+# seq, guild_id, user_id, server_id, timestamp + crc32 = 36 bytes ανά ψήφο
+RECORD = struct.Struct("<QQQII")
+CRC = struct.Struct("<I")
+RECORD_SIZE = RECORD.size + CRC.size
+
+
+def pack_record(seq, guild_id, user_id, server_id, ts) -> bytes:
+    body = RECORD.pack(seq, guild_id, user_id, server_id, ts)
+    return body + CRC.pack(zlib.crc32(body))
+
+
+def read_records(data: bytes) -> tuple:
+    # Σταματάμε στην πρώτη μισή ή χαλασμένη εγγραφή (crash στη μέση ενός write)
+    records = []
+    offset = 0
+    while offset + RECORD_SIZE <= len(data):
+        body = data[offset:offset + RECORD.size]
+        (crc,) = CRC.unpack_from(data, offset + RECORD.size)
+        if zlib.crc32(body) != crc:
+            break
+        records.append(RECORD.unpack(body))
+        offset += RECORD_SIZE
+    return records, len(data) - offset
+
+
+class VoteJournal:
+    # Append-only αρχείο ψήφων: κάθε ψήφος γράφεται και γίνεται fsync πριν
+    # απαντήσουμε στον χρήστη. Πολλές ψήφοι μαζί μοιράζονται ένα fsync.
+    # Κάθε ψήφος πάει στο write-behind μαζί με το seq της (πίνακας journal_applied),
+    # στο ίδιο transaction. Το compact προχωράει το journal_applied_seq μόνο ως την
+    # πρώτη ψήφο που λείπει, οπότε στο startup ξαναπαίζονται όσες δεν γράφτηκαν.
+    def __init__(self, path=JOURNAL_FILE, database=db):
+        self.path = path
+        self.db = database
+        self.seq = 0
+        self._fd = None
+        self._buffer = bytearray()
+        self._unapplied = []      # (seq, record) που ίσως δεν είναι ακόμα στη βάση
+        self._submitted_seq = 0   # ως εδώ οι εγγραφές έχουν σταλεί στο αρχείο
+        self._compacted_upto = 0
+        self._commit = None
+        self._inflight = False
+        self._task = None
+        self._tasks = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+
+    async def _in_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    # ------------------ STARTUP ------------------
+    async def replay(self):
+        data = await self._in_thread(self._read)
+        records, torn = read_records(data)
+        if torn:
+            print(f"⚠️ Vote journal: αγνοήθηκαν {torn} bytes από μισή εγγραφή")
+
+        applied, replayed = await self.db.run(_replay, records)
+        self.seq = max([applied] + [r[0] for r in records])
+        self._submitted_seq = self._compacted_upto = self.seq
+        if replayed:
+            print(f"📒 Vote journal: ξαναπαίχτηκαν {replayed} ψήφοι")
+
+        # Όλα είναι πλέον στη βάση: το journal ξεκινάει άδειο
+        await self._in_thread(self._rewrite, [])
+        self._task = asyncio.get_running_loop().create_task(self._compact_loop())
+
+    def _read(self) -> bytes:
+        if not os.path.exists(self.path):
+            return b""
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    # ------------------ APPEND ------------------
+    def append(self, guild_id: int, server_id: int, user_id: int, when: datetime.datetime) -> asyncio.Future:
+        # Η γραμμή της ψήφου τη γράφει το journal (add_vote με persist=False)
+        self.seq += 1
+        record = pack_record(self.seq, guild_id, user_id, server_id, int(when.timestamp()))
+        self._buffer += record
+        self._unapplied.append((self.seq, record))
+        params = (server_id, guild_id, when.strftime("%Y-%m-%d"), str(user_id))
+        write_behind.mark_dirty(("vote", self.seq), lambda seq=self.seq: _statements(seq, params))
+
+        loop = asyncio.get_running_loop()
+        if self._commit is None:
+            self._commit = loop.create_future()
+        future = self._commit
+        if not self._inflight:
+            self._inflight = True
+            loop.call_soon(self._spawn_commit)
+        return future
+
+    def _spawn_commit(self):
+        # Κρατάμε το task, αλλιώς μπορεί να μαζευτεί από τον GC πριν τελειώσει
+        task = asyncio.get_running_loop().create_task(self._group_commit())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _group_commit(self):
+        while self._buffer:
+            future, self._commit = self._commit, None
+            data, self._buffer = bytes(self._buffer), bytearray()
+            self._submitted_seq = self.seq
+            try:
+                await self._in_thread(self._write, data)
+            except Exception as e:
+                print(f"❌ Vote journal write failed: {e}")
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+        self._inflight = False
+
+    def _write(self, data: bytes):
+        os.write(self._fd, data)
+        os.fsync(self._fd)
+
+    # ------------------ COMPACTION ------------------
+    async def compact(self):
+        applied = await self.db.run(_advance)
+        if applied <= self._compacted_upto:
+            return
+        self._unapplied = [(seq, r) for seq, r in self._unapplied if seq > applied]
+        # Μόνο ό,τι έχει ήδη σταλεί στο αρχείο· τα υπόλοιπα τα γράφει το επόμενο commit
+        keep = [r for seq, r in self._unapplied if seq <= self._submitted_seq]
+        await self._in_thread(self._rewrite, keep)
+        self._compacted_upto = applied
+
+    def _rewrite(self, records):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(b"".join(records))
+            f.flush()
+            os.fsync(f.fileno())
+        if self._fd is not None:
+            os.close(self._fd)
+        os.replace(tmp, self.path)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    async def _compact_loop(self):
+        while True:
+            await asyncio.sleep(COMPACT_INTERVAL)
+            try:
+                await self.compact()
+            except Exception as e:
+                print(f"❌ Vote journal compaction failed: {e}")
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._fd is not None:
+            await self.compact()
+            os.close(self._fd)
+            self._fd = None
+        self._executor.shutdown(wait=True)
+
+
+def _statements(seq, params):
+    # Η ψήφος και το seq της στο ίδιο group, άρα στο ίδιο transaction ακόμα κι
+    # όταν το write-behind γράφει κάθε αλλαγή χωριστά (και με άλλη σειρά μετά από retry)
+    return [
+        (INSERT_VOTE_SQL, params),
+        ("INSERT OR IGNORE INTO journal_applied(seq) VALUES (?)", (seq,)),
+    ]
+
+
+def _advance(conn):
+    # Το journal_applied_seq προχωράει όσο τα seq είναι συνεχόμενα· μια ψήφος που
+    # δεν γράφτηκε (ή πετάχτηκε από το write-behind) το σταματάει, ώστε το
+    # compact να μην τη σβήσει από το journal
+    applied = get_meta(conn, "journal_applied_seq", 0)
+    rows = conn.execute("SELECT seq FROM journal_applied WHERE seq > ? ORDER BY seq", (applied,)).fetchall()
+    upto = applied
+    for (seq,) in rows:
+        if seq != upto + 1:
+            break
+        upto = seq
+    if upto > applied:
+        with conn:
+            set_meta(conn, "journal_applied_seq", upto)
+            conn.execute("DELETE FROM journal_applied WHERE seq <= ?", (upto,))
+    return upto
+
+
+def _replay(conn, records):
+    applied = get_meta(conn, "journal_applied_seq", 0)
+    done = {seq for (seq,) in conn.execute("SELECT seq FROM journal_applied")}
+    pending = [r for r in records if r[0] > applied and r[0] not in done]
+
+    # Μετά το replay όλες οι ψήφοι του journal είναι στη βάση
+    with conn:
+        for seq, guild_id, user_id, server_id, ts in pending:
+            when = datetime.datetime.fromtimestamp(ts)
+            cursor = conn.execute(
+                INSERT_VOTE_SQL, (server_id, guild_id, when.strftime("%Y-%m-%d"), str(user_id))
+            )
+            if cursor.rowcount:
+                add_to_rollups(conn, server_id, when)
+        applied = max([applied] + [r[0] for r in records] + list(done))
+        set_meta(conn, "journal_applied_seq", applied)
+        conn.execute("DELETE FROM journal_applied")
+    return applied, len(pending)
+
+
+vote_journal = VoteJournal()
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from urllib.parse import urlparse, parse_qs
+
+import aiohttp
+
+CONCURRENCY = 10       # πόσα requests τρέχουν ταυτόχρονα
+REQUEST_TIMEOUT = 10   # δευτερόλεπτα ανά request
+CACHE_TTL = 600        # πόσο κρατάμε ένα αποτέλεσμα στη μνήμη
+
+# Status που σημαίνουν ότι ο server δεν υποστηρίζει σωστά HEAD, οπότε ξαναδοκιμάζουμε με GET
+HEAD_FALLBACK_STATUSES = {400, 403, 404, 405, 501}
+DISCORD_CDN_HOSTS = {"cdn.discordapp.com", "media.discordapp.net"}
+
+
+def cdn_expiry(url: str):
+    # Τα attachment links του Discord λήγουν: το ex= είναι unix timestamp σε hex
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.hostname not in DISCORD_CDN_HOSTS:
+        return None
+    ex = parse_qs(parsed.query).get("ex")
+    if not ex:
+        return None
+    try:
+        return int(ex[0], 16)
+    except ValueError:
+        return None
+
+
+class LinkChecker:
+    # Ένα κοινό aiohttp session για όλους τους ελέγχους links,
+    # με όριο παραλληλίας, timeout ανά request και TTL cache.
+    def __init__(self, concurrency=CONCURRENCY, timeout=REQUEST_TIMEOUT, ttl=CACHE_TTL):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.ttl = ttl
+        self.session = None
+        self.cache = {}   # url -> result dict
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def start(self):
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def cached(self, url: str):
+        result = self.cache.get(url)
+        if result and time.time() - result["checked_at"] < self.ttl:
+            return result
+        return None
+
+    async def _status(self, url: str, head_first: bool) -> int:
+        if head_first:
+            async with self.session.head(url, allow_redirects=True) as resp:
+                if resp.status not in HEAD_FALLBACK_STATUSES:
+                    return resp.status
+        async with self.session.get(url) as resp:
+            return resp.status
+
+    async def check(self, url: str, use_cache=True, head_first=True) -> dict:
+        if use_cache:
+            result = self.cached(url)
+            if result:
+                return result
+
+        await self.start()
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                status = await self._status(url, head_first)
+                result = {"url": url, "ok": 200 <= status < 400, "status": status, "error": None}
+            except asyncio.TimeoutError:
+                result = {"url": url, "ok": False, "status": None, "error": "timeout"}
+            except aiohttp.ClientError as e:
+                result = {"url": url, "ok": False, "status": None, "error": str(e) or type(e).__name__}
+
+        result["latency"] = time.monotonic() - started
+        result["checked_at"] = time.time()
+        self.cache[url] = result
+        return result
+
+    async def check_many(self, urls, use_cache=True, head_first=True) -> dict:
+        unique = list(dict.fromkeys(u for u in urls if u))
+        results = await asyncio.gather(
+            *(self.check(u, use_cache=use_cache, head_first=head_first) for u in unique)
+        )
+        return dict(zip(unique, results))
@@ -2,40 +2,85 @@
 import discord
 from discord.ext import commands
 import os
+import time
 from dotenv import load_dotenv
-from views import VoteView
-import json
-from cogs.tickets import TicketView, ViewWithClaimClose, reattach_ticket_views
+from views import VoteButton, rekey_vote_buttons
+from guilds import guild_states
+from analytics import vote_rollups
+from journal import vote_journal
+from pipeline import ensure_ranking
+from persistence import write_behind
+from db import db
+from dispatch import dispatcher
+from cogs.tickets import TicketView, ViewWithClaimClose, register_ticket_views
 
 load_dotenv()
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
-intents.members = True
+# Το members intent δεν χρειάζεται πια: η λήξη του ρόλου ✅ Voter δουλεύει με user IDs
+intents.members = False
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+COGS = ["cogs.vote", "cogs.leaderboard", "cogs.admin", "cogs.tickets", "cogs.linkhealth", "cogs.analytics"]
 
-SERVERS_FILE = "servers.json"
+class LoreBot(commands.AutoShardedBot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started_at = time.perf_counter()
+        self.ready_once = False
+
+    async def setup_hook(self):
+        # Τρέχει μία φορά πριν τη σύνδεση: μόνο τοπική δουλειά, κανένα API call
+        await load_all_cogs(self)
+
+        self.add_view(TicketView())          # Dropdown
+        self.add_view(ViewWithClaimClose())  # Buttons Claim/Close
+        tickets = await register_ticket_views(self)
+
+        # Ένα dynamic item πιάνει όλα τα vote_<id> κουμπιά, όσοι κι αν είναι οι servers
+        self.add_dynamic_items(VoteButton)
+
+        # Πρώτα οι ψήφοι του journal που δεν πρόλαβαν να γραφτούν στη βάση
+        await vote_journal.replay()
+
+        # Servers και ψήφοι όλων των guilds, παράλληλα· η κατάταξη στο background
+        await guild_states.preload()
+        await vote_rollups.load()
+        self.loop.create_task(warm_up())
+        print(f"🔁 Registered vote handler and {tickets} ticket views in {time.perf_counter() - self.started_at:.2f}s")
+
+    async def close(self):
+        # Τελικό flush ό,τι έχει μείνει στο write-behind πριν κλείσει το bot
+        await dispatcher.close()
+        await write_behind.flush()
+        await vote_journal.close()
+        await super().close()
+        db.close()
+
+bot = LoreBot(command_prefix="!", intents=intents)
 
 @bot.event
 async def on_ready():
-    bot.add_view(TicketView())          # Dropdown
-    bot.add_view(ViewWithClaimClose())  # Buttons Claim/Close
-    await reattach_ticket_views(bot)    # <-- προσθήκη εδώ
-    print(f"✅ Bot is online as {bot.user}")
-
-    # Επανεγγραφή κουμπιών σε περίπτωση restart
-    if os.path.exists(SERVERS_FILE):
-        with open(SERVERS_FILE, "r") as f:
-            servers = json.load(f)
-            for server in servers:
-                if "message_id" in server:
-                    bot.add_view(VoteView(server['name']))
-    print("🔁 Ξαναφορτώθηκαν τα κουμπιά των servers.")
-
-async def load_all_cogs():
-    for cog in ["cogs.vote", "cogs.leaderboard", "cogs.admin", "cogs.tickets"]:
+    # Το on_ready ξανατρέχει σε κάθε reconnect: το startup γίνεται μόνο μία φορά
+    if bot.ready_once:
+        print(f"🔌 Reconnected as {bot.user}")
+        return
+    bot.ready_once = True
+    guild_states.adopt_legacy(bot)
+    bot.loop.create_task(rekey_vote_buttons(bot))
+    print(f"✅ Bot is online as {bot.user} (startup {time.perf_counter() - bot.started_at:.2f}s)")
+
+async def warm_up():
+    try:
+        # Η πρώτη ψήφος μετά το restart δεν πληρώνει το πλήρες sort
+        for state in guild_states.all():
+            ensure_ranking(state)
+    except Exception as e:
+        print(f"❌ Warm-up failed: {e}")
+
+async def load_all_cogs(bot):
+    for cog in COGS:
         try:
             await bot.load_extension(cog)
             print(f"✅ Loaded cog: {cog}")
@@ -46,8 +91,6 @@ async def load_all_cogs():
 if __name__ == "__main__":
     token = os.getenv("YOUR_BOT_TOKEN")
     if token:
-        import asyncio
-        asyncio.run(load_all_cogs())
         bot.run(token)
     else:
         print("❌ Δεν βρέθηκε το token.")
@@ -0,0 +1,146 @@
+import asyncio
+import itertools
+import sqlite3
+
+from db import db
+
+FLUSH_DELAY = 2.0       # δευτερόλεπτα debounce πριν γραφτούν οι αλλαγές
+BATCH_THRESHOLD = 50    # μετά από τόσες αλλαγές γράφουμε αμέσως
+RETRY_BACKOFF = 2.0     # μετά από αποτυχία: 2, 4, 8... δευτερόλεπτα
+MAX_RETRY_BACKOFF = 60.0
+MAX_ATTEMPTS = 3        # μια αλλαγή που αποτυγχάνει μόνη της τόσες φορές πετιέται
+
+
+def _apply_batch(conn, statements):
+    # Όλο το batch μπαίνει σε ένα transaction
+    with conn:
+        for sql, params in statements:
+            conn.execute(sql, params)
+
+
+def _apply_each(conn, groups):
+    # Κάθε αλλαγή σε δικό της transaction, για να βρεθεί ποια φταίει
+    errors = {}
+    for key, statements in groups:
+        try:
+            _apply_batch(conn, statements)
+        except Exception as e:
+            errors[key] = e
+    return errors
+
+
+class WriteBehind:
+    # Μαζεύει τις αλλαγές στη μνήμη και τις γράφει στη βάση σε ένα transaction,
+    # εκτός event loop, μετά από ένα μικρό debounce.
+    def __init__(self, database=db, delay=FLUSH_DELAY, threshold=BATCH_THRESHOLD):
+        self.db = database
+        self.delay = delay
+        self.threshold = threshold
+        self.pending = {}   # key -> producer που επιστρέφει [(sql, params), ...]
+        self.attempts = {}  # key -> αποτυχίες της αλλαγής όταν γράφτηκε μόνη της
+        self._failures = 0  # συνεχόμενοι γύροι με αποτυχία (για το backoff)
+        self._seq = itertools.count()
+        self._timer = None
+        self._tasks = set()
+        self._lock = asyncio.Lock()
+
+    def enqueue(self, sql: str, params=()):
+        # Απλό statement που εκτελείται με τη σειρά που μπήκε
+        self.mark_dirty(("stmt", next(self._seq)), lambda: [(sql, params)])
+
+    def mark_dirty(self, key, producer):
+        # Ίδιο key = coalescing: κρατάμε μόνο την τελευταία κατάσταση
+        self.pending[key] = producer
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Εκτός event loop (π.χ. scripts) γράφουμε κατευθείαν
+            self.flush_now()
+            return
+
+        if self._failures:
+            # Υπάρχει ήδη προγραμματισμένο retry με backoff, που θα πάρει και αυτή την αλλαγή
+            return
+        if len(self.pending) >= self.threshold:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = loop.call_soon(self._spawn_flush)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.delay, self._spawn_flush)
+
+    def _spawn_flush(self):
+        self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _take_statements(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self.pending = self.pending, {}
+
+        # Τα producers τρέχουν εδώ, στο thread του loop, ώστε να μη
+        # διαβάζουμε τα dicts ενώ κάποιο callback τα αλλάζει.
+        groups = [(key, producer()) for key, producer in pending.items()]
+        return pending, groups
+
+    async def flush(self):
+        async with self._lock:
+            pending, groups = self._take_statements()
+            statements = [statement for _, group in groups for statement in group]
+            if not statements:
+                return
+            try:
+                await self.db.run(_apply_batch, statements)
+            except Exception as e:
+                print(f"❌ Αποτυχία αποθήκευσης {len(statements)} αλλαγών: {e}")
+                # Ξανά μία-μία, ώστε μια χαλασμένη αλλαγή να μην κρατάει πίσω τις υπόλοιπες
+                errors = await self.db.run(_apply_each, groups)
+            else:
+                errors = {}
+
+            for key, _ in groups:
+                if key not in errors:
+                    self.attempts.pop(key, None)
+            if not errors:
+                self._failures = 0
+                return
+            self._requeue(pending, errors, any_succeeded=len(errors) < len(groups))
+
+    def _requeue(self, pending, errors, any_succeeded):
+        failed = {}
+        for key, error in errors.items():
+            # Ένα OperationalError (π.χ. locked) χωρίς καμία επιτυχία δίπλα του είναι
+            # πρόβλημα της βάσης, όχι της αλλαγής: δεν μετράει στις προσπάθειες
+            if any_succeeded or not isinstance(error, sqlite3.OperationalError):
+                self.attempts[key] = self.attempts.get(key, 0) + 1
+            if self.attempts.get(key, 0) >= MAX_ATTEMPTS:
+                print(f"🗑️ Η αλλαγή {key} απέτυχε {MAX_ATTEMPTS} φορές και πετιέται: {error}")
+                del self.attempts[key]
+                continue
+            failed[key] = pending[key]
+
+        # Ξαναμπαίνουν μπροστά ώστε να κρατηθεί η σειρά
+        failed.update(self.pending)
+        self.pending = failed
+        if not self.pending:
+            self._failures = 0
+            return
+
+        self._failures += 1
+        delay = min(RETRY_BACKOFF * 2 ** (self._failures - 1), MAX_RETRY_BACKOFF)
+        print(f"🔁 Νέα προσπάθεια αποθήκευσης σε {delay:.0f}s ({len(self.pending)} αλλαγές)")
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._spawn_flush)
+
+    def flush_now(self):
+        _, groups = self._take_statements()
+        statements = [statement for _, group in groups for statement in group]
+        if statements:
+            self.db.call(_apply_batch, statements)
+
+
+write_behind = WriteBehind()
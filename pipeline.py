@@ -0,0 +1,133 @@
+import asyncio
+
+import discord
+
+from dispatch import dispatcher, edit_message, NORMAL
+from role_expiry import role_expiry, VOTER_ROLE_NAME
+from guilds import guild_states
+from utils import generate_embed, render_hash
+
+EMBED_DEBOUNCE = 5.0   # οι ψήφοι ενός server μέσα σε αυτό το διάστημα γίνονται ένα edit
+ROLE_RETRIES = 3
+EDIT_RETRIES = 2
+
+
+def _log_failure(what):
+    def callback(future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"⚠️ {what}: {error}")
+    return callback
+
+
+def _remember_hash(server, digest):
+    def callback(future):
+        if not future.cancelled() and future.exception() is None:
+            server["leaderboard_hash"] = digest
+    return callback
+
+
+class VotePipeline:
+    # Οι παρενέργειες μιας ψήφου (ρόλος, embeds) τρέχουν στο background,
+    # ώστε η απάντηση στον χρήστη να φεύγει αμέσως.
+    def __init__(self, delay=EMBED_DEBOUNCE):
+        self.delay = delay
+        self._scheduled = {}   # (guild_id, kind, server_id) -> TimerHandle
+
+    def grant_role(self, guild: discord.Guild, member: discord.Member):
+        voter_role = discord.utils.get(guild.roles, name=VOTER_ROLE_NAME)
+        if voter_role is None:
+            return
+        future = dispatcher.submit(
+            lambda: member.add_roles(voter_role),
+            route=f"guild:{guild.id}",
+            priority=NORMAL,
+            retries=ROLE_RETRIES,
+        )
+        future.add_done_callback(_log_failure(f"Role grant failed for {member}"))
+        role_expiry.record(guild.id, member.id)
+
+    def refresh_embeds(self, guild: discord.Guild, server: dict):
+        self._schedule(guild, server, "serverlist")
+        self._schedule(guild, server, "leaderboard")
+
+        # Ο server αλλάζει θέση στο ranking: όσοι βρίσκονται στο διάστημα
+        # που μετακινήθηκε παίρνουν νέο μήνυμα/rank και ξαναγίνονται edit.
+        state = guild_states.get(guild.id)
+        ensure_ranking(state)
+        for moved in state.ranking.update(server):
+            message_id = state.ranking.slot_for(moved)
+            if message_id is None:
+                continue
+            if moved.get("leaderboard_message_id") != message_id:
+                state.servers.set_leaderboard_message_id(moved, message_id)
+                moved["leaderboard_hash"] = None
+                state.servers.save(moved)
+            self._schedule(guild, moved, "leaderboard")
+
+    def _schedule(self, guild: discord.Guild, server: dict, kind: str):
+        key = (guild.id, kind, server["id"])
+        if key in self._scheduled:
+            return
+        loop = asyncio.get_running_loop()
+        self._scheduled[key] = loop.call_later(self.delay, self._flush, guild, server, kind)
+
+    def _flush(self, guild: discord.Guild, server: dict, kind: str):
+        self._scheduled.pop((guild.id, kind, server["id"]), None)
+
+        # Το embed φτιάχνεται τώρα, με τις πιο πρόσφατες ψήφους και το τρέχον rank.
+        # Χωρίς view=, το Discord κρατάει τα υπάρχοντα κουμπιά του μηνύματος.
+        state = guild_states.get(guild.id)
+        if kind == "serverlist":
+            channel = state.channel(guild, "server_list_channel")
+            if channel and server.get("message_id"):
+                future = edit_message(
+                    channel, server["message_id"],
+                    priority=NORMAL, retries=EDIT_RETRIES,
+                    embed=generate_embed(server, context="serverlist"),
+                )
+                future.add_done_callback(_log_failure(f"Server-list update failed for {server['name']}"))
+            return
+
+        leaderboard_channel = state.channel(guild, "leaderboard_channel")
+        message_id = server.get("leaderboard_message_id")
+        if leaderboard_channel and message_id:
+            digest = render_hash(server, "leaderboard")
+            future = edit_message(
+                leaderboard_channel, message_id,
+                priority=NORMAL, retries=EDIT_RETRIES,
+                embed=generate_embed(server, context="leaderboard"),
+            )
+            future.add_done_callback(_log_failure(f"Leaderboard update failed for {server['name']}"))
+            future.add_done_callback(_remember_hash(server, digest))
+
+
+def ensure_ranking(state):
+    # Μετά από restart ή !addserver το ranking ξαναχτίζεται από τη μνήμη
+    ranking = state.ranking
+    if ranking.built:
+        return
+    servers = state.servers.all()
+    for s in servers:
+        s["votes"] = state.votes.total(s["id"])
+    ranking.rebuild(servers)
+    assign_slots(state)
+
+
+def assign_slots(state) -> bool:
+    # Τα υπάρχοντα μηνύματα χρησιμοποιούνται για live αλλαγές θέσης μόνο
+    # αν η διάταξή τους συμφωνεί ακριβώς με το τρέχον ranking
+    ranking = state.ranking
+    premium = [s for s in state.servers.all() if s.get("premium")]
+    layout = list(reversed(ranking.ranked())) + premium
+    slots = sorted(state.servers.by_leaderboard_message_id)
+    if len(slots) == len(layout) and all(s.get("leaderboard_message_id") == m for s, m in zip(layout, slots)):
+        ranking.slots = slots
+        return True
+    ranking.slots = []
+    return False
+
+
+vote_pipeline = VotePipeline()
@@ -0,0 +1,69 @@
+from bisect import bisect_left
+
+
+def rank_key(server: dict) -> tuple:
+    return (-server.get("votes", 0), server["name"].lower())
+
+
+class Ranking:
+    # Ταξινομημένη λίστα των μη-premium servers με κλειδί (-votes, name).
+    # Μια ψήφος μετακινεί μόνο έναν server: bisect για τη θέση του και
+    # ενημέρωση rank μόνο στο συνεχές διάστημα που άλλαξε.
+    def __init__(self):
+        self._keys = []
+        self._servers = []
+        self._key_of = {}   # server id -> key που έχει μέσα στη λίστα
+        self.slots = []     # leaderboard message IDs με τη σειρά του καναλιού
+        self.built = False
+
+    def rebuild(self, servers):
+        ranked = sorted((s for s in servers if not s.get("premium")), key=rank_key)
+        self._servers = ranked
+        self._keys = [rank_key(s) for s in ranked]
+        self._key_of = {s["id"]: k for s, k in zip(ranked, self._keys)}
+        for idx, server in enumerate(ranked):
+            server["rank"] = idx + 1
+        # Τα μηνύματα αντιστοιχίζονται ξανά από όποιον έκανε το rebuild
+        self.slots = []
+        self.built = True
+
+    def invalidate(self):
+        self.built = False
+        self.slots = []
+
+    def ranked(self) -> list:
+        return list(self._servers)
+
+    def __len__(self):
+        return len(self._servers)
+
+    def update(self, server: dict) -> list:
+        # Επιστρέφει τους servers των οποίων άλλαξε το rank (συνεχές διάστημα)
+        old_key = self._key_of.get(server["id"])
+        if old_key is None:
+            return []
+        new_key = rank_key(server)
+        if new_key == old_key:
+            return []
+
+        old_idx = bisect_left(self._keys, old_key)
+        del self._keys[old_idx]
+        del self._servers[old_idx]
+
+        new_idx = bisect_left(self._keys, new_key)
+        self._keys.insert(new_idx, new_key)
+        self._servers.insert(new_idx, server)
+        self._key_of[server["id"]] = new_key
+
+        lo, hi = min(old_idx, new_idx), max(old_idx, new_idx)
+        moved = self._servers[lo:hi + 1]
+        for idx in range(lo, hi + 1):
+            self._servers[idx]["rank"] = idx + 1
+        return moved
+
+    def slot_for(self, server: dict):
+        # Τα μη-premium εμφανίζονται ανάποδα (rank 1 στο τέλος) και μετά τα premium
+        if not self.slots or server["id"] not in self._key_of:
+            return None
+        return self.slots[len(self._servers) - server["rank"]]
+
@@ -0,0 +1,111 @@
+import asyncio
+import datetime
+import time
+
+import discord
+
+from db import db
+from deferred import DeferredQueue
+from dispatch import dispatcher, BACKGROUND
+
+VOTER_ROLE_NAME = "✅ Voter"
+ROLE_TTL = 24 * 3600   # ο ρόλος λήγει 24 ώρες μετά την απόδοσή του
+REMOVAL_RETRIES = 2
+RETRY_BACKOFF = 60          # μετά από αποτυχία: 1, 2, 4... λεπτά
+MAX_RETRY_BACKOFF = 3600
+
+
+class RoleExpiry:
+    # Ξέρει ακριβώς ποιοι πήραν τον ρόλο ✅ Voter και πότε, και τον αφαιρεί
+    # 24 ώρες μετά από κάθε απόδοση. Το κόστος είναι O(ψηφοφόροι), όχι O(μέλη).
+    def __init__(self, database=db, ttl=ROLE_TTL):
+        self.ttl = ttl
+        self.db = database
+        # (guild_id, user_id) -> granted_at, λήγει στο granted_at + ttl
+        self.queue = DeferredQueue(
+            "role_grants", ("guild_id", "user_id"), "granted_at",
+            due=lambda granted_at: granted_at + self.ttl, database=database
+        )
+        self.failures = {}  # (guild_id, user_id) -> αποτυχημένες αφαιρέσεις στη σειρά
+        self.bot = None
+
+    @property
+    def grants(self) -> dict:
+        return self.queue.entries
+
+    def record(self, guild_id: int, user_id: int, granted_at: float = None):
+        self.failures.pop((guild_id, user_id), None)
+        self.queue.put((guild_id, user_id), granted_at or time.time())
+
+    def start(self, bot):
+        self.bot = bot
+        self.queue.start(self._expire, setup=self._setup)
+
+    async def stop(self):
+        await self.queue.stop()
+
+    async def _setup(self):
+        await self.bot.wait_until_ready()
+        await self._seed_from_votes()
+
+    async def _expire(self, due):
+        done = []
+        jobs = []
+        for grant in due:
+            (guild_id, user_id), _ = grant
+            guild = self.bot.get_guild(guild_id)
+            voter_role = discord.utils.get(guild.roles, name=VOTER_ROLE_NAME) if guild else None
+            if voter_role is None:
+                # Ούτε guild ούτε ρόλος: δεν υπάρχει τίποτα να αφαιρεθεί
+                done.append(grant)
+                continue
+            # Απευθείας HTTP call, χωρίς να χρειάζεται το member cache
+            jobs.append((grant, dispatcher.submit(
+                lambda g=guild_id, u=user_id, r=voter_role.id: self.bot.http.remove_role(g, u, r, reason="Vote expired"),
+                route=f"guild:{guild_id}",
+                priority=BACKGROUND,
+                retries=REMOVAL_RETRIES,
+            )))
+
+        results = await asyncio.gather(*(job for _, job in jobs), return_exceptions=True)
+        failed = 0
+        for (grant, _), result in zip(jobs, results):
+            if isinstance(result, Exception) and not isinstance(result, discord.NotFound):
+                # Το grant μένει (και στη βάση) και ξαναμπαίνει στο heap με backoff
+                failed += 1
+                self._retry(grant, result)
+            else:
+                done.append(grant)
+
+        for key, granted_at in done:
+            self.failures.pop(key, None)
+            self.queue.done(key, granted_at)
+        print(f"🔁 Removed '{VOTER_ROLE_NAME}' from {len(jobs) - failed} voters ({failed} failed)")
+
+    def _retry(self, grant, error):
+        (guild_id, user_id), granted_at = grant
+        attempts = self.failures.get((guild_id, user_id), 0)
+        self.failures[(guild_id, user_id)] = attempts + 1
+        delay = min(RETRY_BACKOFF * 2 ** attempts, MAX_RETRY_BACKOFF)
+        print(f"⚠️ Role removal failed for {user_id} in {guild_id}, retry in {delay}s: {error}")
+        self.queue.retry((guild_id, user_id), granted_at, delay)
+
+    async def _seed_from_votes(self):
+        # Μία φορά: όσοι ψήφισαν πριν υπάρξει ο πίνακας role_grants
+        if await self.db.get_meta("role_grants_seeded"):
+            return
+        yesterday = (datetime.date.today() - datetime.timedelta(days=1)).isoformat()
+        rows = await self.db.fetchall(
+            "SELECT DISTINCT guild_id, day, user_id FROM votes WHERE day >= ?", (yesterday,)
+        )
+        for vote_guild_id, day, user_id in rows:
+            # Ψήφοι χωρίς guild (πριν το multi-guild) ισχύουν για όλα τα guilds
+            guild_ids = [vote_guild_id] if vote_guild_id else [g.id for g in self.bot.guilds]
+            for guild_id in guild_ids:
+                if (guild_id, int(user_id)) not in self.grants:
+                    granted_at = datetime.datetime.fromisoformat(day).timestamp()
+                    self.record(guild_id, int(user_id), granted_at)
+        await self.db.set_meta("role_grants_seeded", True)
+
+
+role_expiry = RoleExpiry()
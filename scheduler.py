@@ -0,0 +1,164 @@
+import asyncio
+import datetime
+import time
+from zoneinfo import ZoneInfo
+
+from db import db
+
+ATHENS = ZoneInfo("Europe/Athens")
+RETRY_DELAY = 300   # αν ένα job αποτύχει, ξαναδοκιμάζουμε μετά από 5 λεπτά
+
+
+class Daily:
+    def __init__(self, hour, minute=0, tz=ATHENS):
+        self.at = datetime.time(hour, minute)
+        self.tz = tz
+
+    def previous(self, now: datetime.datetime) -> datetime.datetime:
+        # Η πιο πρόσφατη ώρα εκτέλεσης <= now
+        local = now.astimezone(self.tz)
+        fire = datetime.datetime.combine(local.date(), self.at, tzinfo=self.tz)
+        if fire > local:
+            fire = datetime.datetime.combine(local.date() - datetime.timedelta(days=1), self.at, tzinfo=self.tz)
+        return fire
+
+    def following(self, now: datetime.datetime) -> datetime.datetime:
+        previous = self.previous(now)
+        return datetime.datetime.combine(previous.date() + datetime.timedelta(days=1), self.at, tzinfo=self.tz)
+
+
+class Monthly:
+    def __init__(self, day=1, hour=0, minute=0, tz=ATHENS):
+        self.day = day
+        self.at = datetime.time(hour, minute)
+        self.tz = tz
+
+    def _fire(self, year, month):
+        return datetime.datetime.combine(datetime.date(year, month, self.day), self.at, tzinfo=self.tz)
+
+    def previous(self, now: datetime.datetime) -> datetime.datetime:
+        local = now.astimezone(self.tz)
+        fire = self._fire(local.year, local.month)
+        if fire > local:
+            year, month = (local.year, local.month - 1) if local.month > 1 else (local.year - 1, 12)
+            fire = self._fire(year, month)
+        return fire
+
+    def following(self, now: datetime.datetime) -> datetime.datetime:
+        previous = self.previous(now)
+        year, month = (previous.year, previous.month + 1) if previous.month < 12 else (previous.year + 1, 1)
+        return self._fire(year, month)
+
+
+class Every:
+    # Σταθερό διάστημα, μετρημένο από το epoch ώστε οι περίοδοι να μην αλλάζουν με τα restarts
+    def __init__(self, hours=0, minutes=0):
+        self.seconds = int(datetime.timedelta(hours=hours, minutes=minutes).total_seconds())
+
+    def previous(self, now: datetime.datetime) -> datetime.datetime:
+        ts = int(now.timestamp())
+        return datetime.datetime.fromtimestamp(ts - ts % self.seconds, tz=datetime.timezone.utc)
+
+    def following(self, now: datetime.datetime) -> datetime.datetime:
+        return self.previous(now) + datetime.timedelta(seconds=self.seconds)
+
+
+class Job:
+    def __init__(self, name, callback, schedule):
+        self.name = name
+        self.callback = callback
+        self.schedule = schedule
+        self.last_period = None
+        self.retry_at = None
+
+
+class Scheduler:
+    # Ένα task για όλες τις περιοδικές δουλειές: υπολογίζει την επόμενη ώρα
+    # εκτέλεσης κάθε job και κοιμάται μέχρι τότε. Η τελευταία περίοδος που
+    # έτρεξε αποθηκεύεται, ώστε μετά από restart να γίνεται catch-up μία φορά.
+    def __init__(self, database=db):
+        self.db = database
+        self.jobs = {}
+        self.bot = None
+        self._task = None
+        self._wakeup = asyncio.Event()
+
+    def add_job(self, name: str, callback, schedule):
+        self.jobs[name] = Job(name, callback, schedule)
+        self._wakeup.set()
+
+    def remove_job(self, name: str):
+        self.jobs.pop(name, None)
+
+    def start(self, bot):
+        self.bot = bot
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _load_periods(self):
+        rows = await self.db.fetchall("SELECT name, last_period FROM scheduler_jobs")
+        return dict(rows)
+
+    async def _save_period(self, job):
+        await self.db.execute(
+            "INSERT INTO scheduler_jobs(name, last_period, last_run) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET last_period = excluded.last_period, last_run = excluded.last_run",
+            (job.name, job.last_period, time.time())
+        )
+
+    async def _run(self):
+        await self.bot.wait_until_ready()
+        periods = await self._load_periods()
+
+        while True:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            for job in list(self.jobs.values()):
+                period = job.schedule.previous(now).isoformat()
+
+                if job.last_period is None:
+                    job.last_period = periods.get(job.name)
+                    if job.last_period is None:
+                        # Νέο job: δεν τρέχει αναδρομικά, ξεκινάει από την επόμενη περίοδο
+                        job.last_period = period
+                        await self._save_period(job)
+                        continue
+
+                if job.last_period == period:
+                    continue
+                if job.retry_at and time.time() < job.retry_at:
+                    continue
+
+                print(f"⏰ Running scheduled job {job.name} for {period}")
+                try:
+                    await job.callback()
+                except Exception as e:
+                    job.retry_at = time.time() + RETRY_DELAY
+                    print(f"❌ Scheduled job {job.name} failed: {e}")
+                    continue
+
+                job.retry_at = None
+                job.last_period = period
+                await self._save_period(job)
+
+            await self._sleep_until_next()
+
+    async def _sleep_until_next(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        wakeups = [job.schedule.following(now).timestamp() for job in self.jobs.values()]
+        wakeups += [job.retry_at for job in self.jobs.values() if job.retry_at]
+        timeout = max(0.0, min(wakeups) - time.time()) if wakeups else None
+
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+scheduler = Scheduler()
@@ -0,0 +1,179 @@
+import json
+
+from db import db, upsert_server_sql
+from persistence import write_behind
+
+INSERT_VOTE_SQL = "INSERT OR IGNORE INTO votes(server_id, guild_id, day, user_id) VALUES (?, ?, ?, ?)"
+
+
+class VoteStore:
+    # Μνήμη ψήφων ενός guild: φορτώνεται μία φορά από τη βάση
+    def __init__(self, guild_id: int = 0, database=db):
+        self.guild_id = guild_id
+        self.db = database
+        self.votes = {}          # server_id -> {"total": int, "by_day": {day: [user_id, ...]}}
+        self.voters_by_day = {}  # day -> set(user_id) για O(1) έλεγχο "ψήφισε ήδη σήμερα"
+        self.loaded = False
+
+    VOTES_SQL = "SELECT server_id, day, user_id FROM votes WHERE guild_id = ? ORDER BY rowid"
+
+    def load(self):
+        self._apply(self.db.fetchall_sync(self.VOTES_SQL, (self.guild_id,)))
+
+    async def preload(self):
+        # Ασύγχρονο φόρτωμα στο background κατά το startup, χωρίς να μπλοκάρει το loop
+        rows = await self.db.fetchall(self.VOTES_SQL, (self.guild_id,))
+        if not self.loaded:
+            self._apply(rows)
+
+    def _apply(self, rows):
+        self.votes = {}
+        self.voters_by_day = {}
+        for server_id, day, user_id in rows:
+            data = self.votes.setdefault(server_id, {"total": 0, "by_day": {}})
+            data["by_day"].setdefault(day, []).append(user_id)
+            data["total"] += 1
+            self.voters_by_day.setdefault(day, set()).add(user_id)
+        self.loaded = True
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def has_voted(self, user_id: str, day: str) -> bool:
+        self.ensure_loaded()
+        return user_id in self.voters_by_day.get(day, ())
+
+    def ensure_server(self, server_id: int) -> dict:
+        self.ensure_loaded()
+        if server_id not in self.votes:
+            self.votes[server_id] = {"total": 0, "by_day": {}}
+        return self.votes[server_id]
+
+    def add_vote(self, server_id: int, user_id: str, day: str, persist: bool = True) -> int:
+        # persist=False όταν τη γραμμή τη γράφει το vote journal, μαζί με το marker του
+        data = self.ensure_server(server_id)
+        data["by_day"].setdefault(day, []).append(user_id)
+        data["total"] += 1
+        self.voters_by_day.setdefault(day, set()).add(user_id)
+        if persist:
+            write_behind.enqueue(INSERT_VOTE_SQL, (server_id, self.guild_id, day, user_id))
+        return data["total"]
+
+    def total(self, server_id: int) -> int:
+        self.ensure_loaded()
+        return self.votes.get(server_id, {}).get("total", 0)
+
+    def reset(self):
+        self.ensure_loaded()
+        for server_id in self.votes:
+            self.votes[server_id] = {"total": 0, "by_day": {}}
+        self.voters_by_day = {}
+        write_behind.enqueue("DELETE FROM votes WHERE guild_id = ?", (self.guild_id,))
+
+
+class ServerRegistry:
+    # Η λίστα των servers ενός guild φορτώνεται μία φορά και μοιράζεται σε όλα τα cogs.
+    # Κρατάμε και indexes ώστε κάθε lookup να είναι O(1) αντί για γραμμικό ψάξιμο.
+    def __init__(self, guild_id: int = 0, database=db):
+        self.guild_id = guild_id
+        self.db = database
+        self.servers = []
+        self.by_id = {}                      # server id -> server
+        self.by_name = {}                    # casefold(name) -> server
+        self.by_message_id = {}              # message_id -> server (📜︱server-list)
+        self.by_leaderboard_message_id = {}  # leaderboard_message_id -> server
+        self.loaded = False
+
+    SERVERS_SQL = "SELECT data FROM servers WHERE guild_id = ? ORDER BY position"
+
+    def load(self):
+        self._apply(self.db.fetchall_sync(self.SERVERS_SQL, (self.guild_id,)))
+
+    async def preload(self):
+        rows = await self.db.fetchall(self.SERVERS_SQL, (self.guild_id,))
+        if not self.loaded:
+            self._apply(rows)
+
+    def _apply(self, rows):
+        self.servers = [json.loads(data) for (data,) in rows]
+        self.reindex()
+        self.loaded = True
+
+    def reindex(self):
+        self.by_id = {}
+        self.by_name = {}
+        self.by_message_id = {}
+        self.by_leaderboard_message_id = {}
+        for server in self.servers:
+            self._index(server)
+
+    def _index(self, server: dict):
+        self.by_id[server["id"]] = server
+        self.by_name[normalize_name(server["name"])] = server
+        if server.get("message_id"):
+            self.by_message_id[server["message_id"]] = server
+        if server.get("leaderboard_message_id"):
+            self.by_leaderboard_message_id[server["leaderboard_message_id"]] = server
+
+    def all(self) -> list:
+        if not self.loaded:
+            self.load()
+        return self.servers
+
+    def get(self, name: str):
+        self.all()
+        return self.by_name.get(normalize_name(name))
+
+    def get_by_id(self, server_id: int):
+        self.all()
+        return self.by_id.get(server_id)
+
+    def get_by_message_id(self, message_id: int):
+        self.all()
+        return self.by_message_id.get(message_id)
+
+    def get_by_leaderboard_message_id(self, message_id: int):
+        self.all()
+        return self.by_leaderboard_message_id.get(message_id)
+
+    def with_message_id(self) -> list:
+        self.all()
+        return list(self.by_message_id.values())
+
+    def rename(self, server: dict, new_name: str):
+        # Τα votes και τα κουμπιά δείχνουν στο id, οπότε αλλάζει μόνο το index ονομάτων
+        if self.by_name.get(normalize_name(server["name"])) is server:
+            del self.by_name[normalize_name(server["name"])]
+        server["name"] = new_name
+        self.by_name[normalize_name(new_name)] = server
+        self.save(server)
+
+    def set_message_id(self, server: dict, message_id: int):
+        old = server.get("message_id")
+        if old and self.by_message_id.get(old) is server:
+            del self.by_message_id[old]
+        server["message_id"] = message_id
+        self.by_message_id[message_id] = server
+
+    def set_leaderboard_message_id(self, server: dict, message_id: int):
+        old = server.get("leaderboard_message_id")
+        if old and self.by_leaderboard_message_id.get(old) is server:
+            del self.by_leaderboard_message_id[old]
+        server["leaderboard_message_id"] = message_id
+        self.by_leaderboard_message_id[message_id] = server
+
+    def add(self, server: dict):
+        self.all().append(server)
+        self._index(server)
+        self.save(server)
+
+    def save(self, server: dict = None):
+        # Με server γράφεται μόνο η δική του γραμμή, αλλιώς όλη η λίστα
+        targets = [server] if server is not None else self.all()
+        for s in targets:
+            write_behind.mark_dirty(("server", s["id"]), lambda s=s: [upsert_server_sql(s, self.guild_id)])
+
+
+def normalize_name(name: str) -> str:
+    return name.strip().casefold()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Τα modules του bot είναι στη ρίζα του repo, όχι σε package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,185 @@
+import asyncio
+import socket
+
+from aiohttp import web
+
+from linkcheck import LinkChecker, cdn_expiry
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StubServer:
+    # Τοπικός aiohttp server με σταθερά routes για τους ελέγχους
+    def __init__(self):
+        self.hits = []
+        self.app = web.Application()
+        self.app.router.add_route("*", "/ok", self.ok)
+        self.app.router.add_route("*", "/missing", self.missing)
+        self.app.router.add_route("*", "/slow", self.slow)
+        self.app.router.add_route("*", "/no-head", self.no_head)
+        self.runner = None
+        self.port = None
+
+    async def ok(self, request):
+        self.hits.append((request.method, request.path))
+        return web.Response(text="ok")
+
+    async def missing(self, request):
+        self.hits.append((request.method, request.path))
+        return web.Response(status=404)
+
+    async def slow(self, request):
+        self.hits.append((request.method, request.path))
+        await asyncio.sleep(2)
+        return web.Response(text="late")
+
+    async def no_head(self, request):
+        # Servers που απαντούν 405 στο HEAD αλλά 200 στο GET
+        self.hits.append((request.method, request.path))
+        if request.method == "HEAD":
+            return web.Response(status=405)
+        return web.Response(text="ok")
+
+    async def __aenter__(self):
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        self.port = _free_port()
+        await web.TCPSite(self.runner, "127.0.0.1", self.port).start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _check(path, **kwargs):
+    async with StubServer() as server:
+        checker = LinkChecker(timeout=0.5)
+        try:
+            result = await checker.check(server.url(path), **kwargs)
+        finally:
+            await checker.close()
+        return result, server.hits
+
+
+def test_ok():
+    result, _ = run(_check("/ok"))
+    assert result["ok"] is True
+    assert result["status"] == 200
+    assert result["error"] is None
+    assert result["latency"] >= 0
+
+
+def test_not_found():
+    result, hits = run(_check("/missing"))
+    assert result["ok"] is False
+    assert result["status"] == 404
+    # Το 404 στο HEAD ξαναδοκιμάζεται με GET πριν θεωρηθεί σπασμένο
+    assert hits == [("HEAD", "/missing"), ("GET", "/missing")]
+
+
+def test_timeout():
+    result, _ = run(_check("/slow"))
+    assert result["ok"] is False
+    assert result["status"] is None
+    assert result["error"] == "timeout"
+
+
+def test_connection_refused():
+    async def scenario():
+        checker = LinkChecker(timeout=0.5)
+        try:
+            return await checker.check(f"http://127.0.0.1:{_free_port()}/ok")
+        finally:
+            await checker.close()
+
+    result = run(scenario())
+    assert result["ok"] is False
+    assert result["status"] is None
+    assert result["error"]
+
+
+def test_head_falls_back_to_get():
+    result, hits = run(_check("/no-head"))
+    assert result["ok"] is True
+    assert result["status"] == 200
+    assert hits == [("HEAD", "/no-head"), ("GET", "/no-head")]
+
+
+def test_get_only():
+    result, hits = run(_check("/ok", head_first=False))
+    assert result["ok"] is True
+    assert hits == [("GET", "/ok")]
+
+
+def test_cache_hit_within_ttl():
+    async def scenario():
+        async with StubServer() as server:
+            checker = LinkChecker(timeout=0.5, ttl=60)
+            try:
+                first = await checker.check(server.url("/ok"))
+                second = await checker.check(server.url("/ok"))
+                fresh = await checker.check(server.url("/ok"), use_cache=False)
+            finally:
+                await checker.close()
+            return first, second, fresh, server.hits
+
+    first, second, fresh, hits = run(scenario())
+    assert second is first
+    assert fresh is not first
+    assert hits == [("HEAD", "/ok"), ("HEAD", "/ok")]
+
+
+def test_cache_expires_after_ttl():
+    async def scenario():
+        async with StubServer() as server:
+            checker = LinkChecker(timeout=0.5, ttl=0)
+            try:
+                await checker.check(server.url("/ok"))
+                await checker.check(server.url("/ok"))
+            finally:
+                await checker.close()
+            return server.hits
+
+    assert run(scenario()) == [("HEAD", "/ok"), ("HEAD", "/ok")]
+
+
+def test_check_many_dedupes_urls():
+    async def scenario():
+        async with StubServer() as server:
+            checker = LinkChecker(timeout=0.5)
+            try:
+                urls = [server.url("/ok"), server.url("/missing"), server.url("/ok"), None, ""]
+                results = await checker.check_many(urls)
+            finally:
+                await checker.close()
+            return server, results
+
+    server, results = run(scenario())
+    assert list(results) == [server.url("/ok"), server.url("/missing")]
+    assert results[server.url("/ok")]["ok"] is True
+    assert results[server.url("/missing")]["ok"] is False
+
+
+def test_cdn_expiry():
+    url = "https://cdn.discordapp.com/attachments/1/2/banner.png?ex=66f1a2b3&is=66f05133&hm=abc"
+    assert cdn_expiry(url) == 0x66F1A2B3
+    assert cdn_expiry("https://media.discordapp.net/x.png?ex=10") == 16
+
+
+def test_cdn_expiry_ignores_other_links():
+    assert cdn_expiry(None) is None
+    assert cdn_expiry("") is None
+    assert cdn_expiry("https://example.com/x.png?ex=66f1a2b3") is None
+    assert cdn_expiry("https://cdn.discordapp.com/x.png") is None
+    assert cdn_expiry("https://cdn.discordapp.com/x.png?ex=zz") is None
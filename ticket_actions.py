@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import discord
+
+from db import db
+from deferred import DeferredQueue
+from dispatch import dispatcher, BACKGROUND
+from ticket_store import ticket_registry, CLOSING
+from transcripts import transcript_archive
+
+CLOSE = "close"
+CLOSE_DELAY = 10      # δευτερόλεπτα από το Close μέχρι να σβηστεί το κανάλι
+RETRY_DELAY = 60      # αν αποτύχει το delete, ξαναδοκιμάζουμε μετά από 1 λεπτό
+DELETE_RETRIES = 2
+
+
+class TicketActions:
+    # Μόνιμη ουρά για καθυστερημένες ενέργειες σε tickets (προς το παρόν: close).
+    # Η ώρα εκτέλεσης αποθηκεύεται στη βάση, οπότε ένα restart δεν αφήνει
+    # tickets ανοιχτά, και ένα task εξυπηρετεί όλες τις ενέργειες.
+    def __init__(self, database=db):
+        # (channel_id, action) -> due_at
+        self.queue = DeferredQueue("ticket_actions", ("channel_id", "action"), "due_at", database=database)
+        self.bot = None
+
+    @property
+    def pending(self) -> dict:
+        return self.queue.entries
+
+    def schedule(self, channel_id: int, action: str = CLOSE, delay: float = CLOSE_DELAY):
+        self.queue.put((channel_id, action), time.time() + delay)
+
+    def start(self, bot):
+        self.bot = bot
+        self.queue.start(self._fire, setup=self._setup)
+
+    async def stop(self):
+        await self.queue.stop()
+
+    async def _setup(self):
+        await self.bot.wait_until_ready()
+        # Tickets που έμειναν σε "closing" χωρίς ενέργεια (crash πριν γραφτεί) κλείνουν τώρα
+        for ticket in ticket_registry.all():
+            if ticket["status"] == CLOSING and (ticket["channel_id"], CLOSE) not in self.pending:
+                self.schedule(ticket["channel_id"], CLOSE, delay=0)
+
+    async def _fire(self, due):
+        channels = []
+        for key, due_at in due:
+            channel_id, action = key
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                # Το κανάλι έχει ήδη σβηστεί
+                ticket_registry.close(channel_id)
+                self.queue.done(key, due_at)
+                continue
+            channels.append((key, due_at, channel))
+
+        # Πρώτα το transcript· αν αποτύχει, το κανάλι δεν σβήνεται και ξαναδοκιμάζουμε
+        archived = await asyncio.gather(
+            *(transcript_archive.archive(channel, ticket_registry.get(channel.id)) for _, _, channel in channels),
+            return_exceptions=True
+        )
+
+        jobs = []
+        for (key, due_at, channel), result in zip(channels, archived):
+            if isinstance(result, discord.Forbidden):
+                print(f"⚠️ Ticket {channel.id}: χωρίς δικαίωμα ανάγνωσης, κλείνει χωρίς transcript")
+            elif isinstance(result, Exception):
+                print(f"⚠️ Ticket {channel.id} transcript failed: {result}")
+                self.schedule(*key, delay=RETRY_DELAY)
+                continue
+            # Όλα τα deletes περνάνε από τον dispatcher, με το rate limit του guild
+            jobs.append(((key, due_at), dispatcher.submit(
+                lambda c=channel: c.delete(reason="Ticket closed"),
+                route=f"guild:{channel.guild.id}",
+                priority=BACKGROUND,
+                retries=DELETE_RETRIES,
+            )))
+
+        results = await asyncio.gather(*(job for _, job in jobs), return_exceptions=True)
+        failed = 0
+        for ((channel_id, action), due_at), result in zip((entry for entry, _ in jobs), results):
+            if isinstance(result, Exception) and not isinstance(result, discord.NotFound):
+                failed += 1
+                print(f"⚠️ Ticket {channel_id} {action} failed: {result}")
+                self.schedule(channel_id, action, delay=RETRY_DELAY)
+                continue
+            ticket_registry.close(channel_id)
+            self.queue.done((channel_id, action), due_at)
+
+        if jobs:
+            print(f"🎫 Έκλεισαν {len(jobs) - failed} tickets ({failed} failed)")
+
+
+ticket_actions = TicketActions()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import discord
+
+from db import db
+from dispatch import edit_message, send_message, BACKGROUND
+from ticket_store import ticket_registry, OPEN, CLOSING
+
+DASHBOARD_DEBOUNCE = 3.0   # όλες οι αλλαγές μέσα σε αυτό το διάστημα γίνονται ένα edit
+EDIT_RETRIES = 2
+MAX_LINES = 15             # ανά κατηγορία, για να χωράει στο όριο των 1024 χαρακτήρων
+
+
+def _meta_key(guild_id: int) -> str:
+    return f"ticket_dashboard:{guild_id}"
+
+
+def _line(ticket: dict) -> str:
+    reason = (ticket["reason"] or "other").replace("_", " ").title()
+    owner = f"<@{ticket['owner_id']}>" if ticket["owner_id"] else "?"
+    line = f"<#{ticket['channel_id']}> • {reason} • {owner} • <t:{int(ticket['created_at'] or 0)}:R>"
+    if ticket["claimed_by"]:
+        line += f" • 🔒 <@{ticket['claimed_by']}>"
+    return line
+
+
+def _field(tickets: list) -> str:
+    if not tickets:
+        return "—"
+    lines = [_line(t) for t in tickets[:MAX_LINES]]
+    if len(tickets) > MAX_LINES:
+        lines.append(f"… +{len(tickets) - MAX_LINES} ακόμα")
+    return "\n".join(lines)[:1024]
+
+
+def build_embed(guild_id: int) -> discord.Embed:
+    # Μόνο από το ticket_registry στη μνήμη, χωρίς να διαβάζουμε κανάλια
+    tickets = sorted(
+        (t for t in ticket_registry.all() if t["guild_id"] == guild_id),
+        key=lambda t: t["created_at"] or 0
+    )
+    unclaimed = [t for t in tickets if t["status"] == OPEN and not t["claimed_by"]]
+    claimed = [t for t in tickets if t["status"] == OPEN and t["claimed_by"]]
+    closing = [t for t in tickets if t["status"] == CLOSING]
+
+    embed = discord.Embed(
+        title="🎫 Ticket Dashboard",
+        description=f"🟢 {len(unclaimed)} unclaimed • 🟡 {len(claimed)} claimed • 🔴 {len(closing)} closing",
+        color=discord.Color.dark_red()
+    )
+    embed.add_field(name="🟢 Unclaimed", value=_field(unclaimed), inline=False)
+    embed.add_field(name="🟡 Claimed", value=_field(claimed), inline=False)
+    if closing:
+        embed.add_field(name="🔴 Closing", value=_field(closing), inline=False)
+    embed.timestamp = discord.utils.utcnow()
+    return embed
+
+
+class TicketDashboard:
+    # Ένα μήνυμα ανά guild με την εικόνα όλων των ανοιχτών tickets. Κάθε αλλαγή
+    # στο ticket_registry ξεκινάει ένα timer· όσες έρθουν μέχρι να λήξει
+    # συγχωνεύονται, οπότε 20 νέα tickets μαζί κάνουν ένα edit.
+    def __init__(self, delay=DASHBOARD_DEBOUNCE, database=db):
+        self.delay = delay
+        self.db = database
+        self.messages = {}     # guild_id -> (channel_id, message_id)
+        self._scheduled = {}   # guild_id -> TimerHandle
+        self.bot = None
+
+    async def start(self, bot):
+        self.bot = bot
+        rows = await self.db.fetchall("SELECT key, value FROM meta WHERE key LIKE 'ticket_dashboard:%'")
+        for key, value in rows:
+            channel_id, message_id = json.loads(value)
+            self.messages[int(key.split(":", 1)[1])] = (channel_id, message_id)
+        if self.touch not in ticket_registry.listeners:
+            ticket_registry.listeners.append(self.touch)
+
+    def stop(self):
+        if self.touch in ticket_registry.listeners:
+            ticket_registry.listeners.remove(self.touch)
+        for handle in self._scheduled.values():
+            handle.cancel()
+        self._scheduled.clear()
+
+    def touch(self, guild_id: int):
+        if guild_id not in self.messages or guild_id in self._scheduled:
+            return
+        loop = asyncio.get_running_loop()
+        self._scheduled[guild_id] = loop.call_later(self.delay, self._flush, guild_id)
+
+    def refresh_all(self):
+        for guild_id in list(self.messages):
+            self.touch(guild_id)
+
+    def _flush(self, guild_id: int):
+        self._scheduled.pop(guild_id, None)
+        channel_id, message_id = self.messages.get(guild_id, (None, None))
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel is None:
+            return
+        # Το embed φτιάχνεται τώρα, με την τρέχουσα κατάσταση όλων των tickets
+        future = edit_message(
+            channel, message_id,
+            priority=BACKGROUND, retries=EDIT_RETRIES,
+            embed=build_embed(guild_id),
+        )
+        future.add_done_callback(self._edit_done(guild_id, message_id))
+
+    def _edit_done(self, guild_id, message_id):
+        def callback(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if isinstance(error, discord.NotFound) and self.messages.get(guild_id, (None, None))[1] == message_id:
+                # Το μήνυμα σβήστηκε με το χέρι: σταματάμε να το ενημερώνουμε
+                del self.messages[guild_id]
+                asyncio.get_running_loop().create_task(
+                    self.db.execute("DELETE FROM meta WHERE key = ?", (_meta_key(guild_id),))
+                )
+            elif error is not None:
+                print(f"⚠️ Ticket dashboard update failed: {error}")
+        return callback
+
+    async def post(self, channel: discord.TextChannel) -> discord.Message:
+        # Νέο dashboard στο κανάλι· το παλιό (αν υπάρχει) σβήνεται
+        guild_id = channel.guild.id
+        previous = self.messages.get(guild_id)
+        message = await send_message(channel, embed=build_embed(guild_id))
+        self.messages[guild_id] = (channel.id, message.id)
+        await self.db.set_meta(_meta_key(guild_id), [channel.id, message.id])
+
+        old_channel = self.bot.get_channel(previous[0]) if previous else None
+        if old_channel is not None:
+            try:
+                await old_channel.get_partial_message(previous[1]).delete()
+            except discord.HTTPException:
+                pass
+        return message
+
+
+ticket_dashboard = TicketDashboard()
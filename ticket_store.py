@@ -0,0 +1,158 @@
+import time
+
+import discord
+
+from db import db
+from persistence import write_behind
+
+TICKET_COLUMNS = (
+    "channel_id", "message_id", "guild_id", "owner_id", "reason",
+    "created_at", "claimed_by", "status", "closed_at",
+)
+
+# Κύκλος ζωής: open -> closing (πατήθηκε Close) -> closed (το κανάλι σβήστηκε)
+OPEN = "open"
+CLOSING = "closing"
+CLOSED = "closed"
+
+CLOSED_RETENTION = 30 * 24 * 3600   # τα κλειστά tickets μένουν στη βάση 30 μέρες
+
+
+class TicketRegistry:
+    # Τα ζωντανά tickets (open/closing) στη μνήμη: channel_id -> ticket και
+    # (guild, owner) -> channel_id, ώστε ο έλεγχος "έχει ήδη ticket" να είναι
+    # ένα dict lookup αντί για σκανάρισμα καναλιών. Τα κλειστά μένουν μόνο στη βάση.
+    def __init__(self, database=db):
+        self.db = database
+        self.tickets = {}    # channel_id -> dict
+        self.by_owner = {}   # (guild_id, owner_id) -> channel_id
+        self.listeners = []  # fn(guild_id), καλούνται σε κάθε αλλαγή (π.χ. το dashboard)
+
+    async def load(self):
+        rows = await self.db.fetchall(
+            f"SELECT {', '.join(TICKET_COLUMNS)} FROM tickets WHERE status != ?", (CLOSED,)
+        )
+        self.tickets = {}
+        self.by_owner = {}
+        for row in rows:
+            self._index(dict(zip(TICKET_COLUMNS, row)))
+
+    def _index(self, ticket: dict):
+        self.tickets[ticket["channel_id"]] = ticket
+        if ticket["guild_id"] and ticket["owner_id"]:
+            self.by_owner[(ticket["guild_id"], ticket["owner_id"])] = ticket["channel_id"]
+
+    def _changed(self, guild_id):
+        for listener in self.listeners:
+            listener(guild_id)
+
+    def all(self) -> list:
+        return list(self.tickets.values())
+
+    def get(self, channel_id: int):
+        return self.tickets.get(channel_id)
+
+    def owner_ticket(self, guild_id: int, owner_id: int):
+        return self.by_owner.get((guild_id, owner_id))
+
+    def open(self, channel: discord.TextChannel, message_id: int, owner_id: int, reason: str) -> dict:
+        ticket = {
+            "channel_id": channel.id,
+            "message_id": message_id,
+            "guild_id": channel.guild.id,
+            "owner_id": owner_id,
+            "reason": reason,
+            "created_at": time.time(),
+            "claimed_by": None,
+            "status": OPEN,
+            "closed_at": None,
+        }
+        self._index(ticket)
+        self.save(ticket)
+        self._changed(ticket["guild_id"])
+        return ticket
+
+    def claim(self, channel_id: int, user_id: int):
+        ticket = self.tickets.get(channel_id)
+        if ticket:
+            ticket["claimed_by"] = user_id
+            self.save(ticket)
+            self._changed(ticket["guild_id"])
+        return ticket
+
+    def begin_close(self, channel_id: int):
+        ticket = self.tickets.get(channel_id)
+        if ticket is None or ticket["status"] != OPEN:
+            return None
+        ticket["status"] = CLOSING
+        self.save(ticket)
+        self._changed(ticket["guild_id"])
+        return ticket
+
+    def close(self, channel_id: int):
+        # Το κανάλι δεν υπάρχει πια: βγαίνει από τη μνήμη, στη βάση μένει ως closed
+        ticket = self.tickets.pop(channel_id, None)
+        if ticket is None:
+            return None
+        key = (ticket["guild_id"], ticket["owner_id"])
+        if self.by_owner.get(key) == channel_id:
+            del self.by_owner[key]
+        ticket["status"] = CLOSED
+        ticket["closed_at"] = time.time()
+        self.save(ticket)
+        self._changed(ticket["guild_id"])
+        return ticket
+
+    def save(self, ticket: dict):
+        write_behind.mark_dirty(("ticket", ticket["channel_id"]), lambda t=ticket: [(
+            f"INSERT INTO tickets({', '.join(TICKET_COLUMNS)}) VALUES ({', '.join('?' * len(TICKET_COLUMNS))}) "
+            "ON CONFLICT(channel_id) DO UPDATE SET message_id = excluded.message_id, guild_id = excluded.guild_id, "
+            "owner_id = excluded.owner_id, reason = excluded.reason, created_at = excluded.created_at, "
+            "claimed_by = excluded.claimed_by, status = excluded.status, closed_at = excluded.closed_at",
+            tuple(t[c] for c in TICKET_COLUMNS)
+        )])
+
+    def backfill(self, bot) -> int:
+        # Tickets από πριν το registry: owner = το member overwrite του καναλιού (από το cache, χωρίς API)
+        filled = 0
+        for ticket in self.all():
+            if ticket["owner_id"]:
+                continue
+            channel = bot.get_channel(ticket["channel_id"])
+            if not isinstance(channel, discord.TextChannel):
+                continue
+            owners = [
+                target.id for target in channel.overwrites
+                if not isinstance(target, discord.Role) and target.id != bot.user.id
+            ]
+            if len(owners) != 1:
+                continue
+            ticket["guild_id"] = channel.guild.id
+            ticket["owner_id"] = owners[0]
+            self._index(ticket)
+            self.save(ticket)
+            self._changed(ticket["guild_id"])
+            filled += 1
+        return filled
+
+    def prune(self, bot) -> int:
+        # Ζωντανά tickets χωρίς κανάλι (σβήστηκε όσο το bot ήταν offline) κλείνουν,
+        # και τα παλιά κλειστά φεύγουν από τη βάση
+        dead = []
+        for ticket in self.all():
+            guild = bot.get_guild(ticket["guild_id"]) if ticket["guild_id"] else None
+            if guild is not None and guild.unavailable:
+                continue
+            if bot.get_channel(ticket["channel_id"]) is None:
+                dead.append(ticket["channel_id"])
+        for channel_id in dead:
+            self.close(channel_id)
+
+        write_behind.enqueue(
+            "DELETE FROM tickets WHERE status = ? AND closed_at < ?",
+            (CLOSED, time.time() - CLOSED_RETENTION)
+        )
+        return len(dead)
+
+
+ticket_registry = TicketRegistry()
@@ -0,0 +1,161 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+import discord
+
+from db import db
+
+TRANSCRIPT_DIR = "transcripts"
+PAGE_SIZE = 100   # όσα μηνύματα δίνει το Discord ανά request
+
+INDEX_COLUMNS = ("channel_id", "guild_id", "owner_id", "reason", "channel_name", "closed_at", "digest", "messages")
+
+
+async def history_pages(channel: discord.TextChannel, page_size: int = PAGE_SIZE):
+    # Async generator: μία σελίδα τη φορά, από το παλαιότερο μήνυμα προς το νεότερο,
+    # ώστε στη μνήμη να υπάρχει μόνο η τρέχουσα σελίδα
+    after = None
+    while True:
+        page = [m async for m in channel.history(limit=page_size, after=after, oldest_first=True)]
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after = page[-1]
+
+
+def _attachment_key(url: str) -> str:
+    # Τα URLs του CDN έχουν υπογραφή στο query string που αλλάζει· το path μένει ίδιο
+    parts = urlsplit(url)
+    return parts.netloc + parts.path
+
+
+class TranscriptWriter:
+    # Γράφει gzip JSONL σε προσωρινό αρχείο και το ονομάζει με το sha256 του περιεχομένου:
+    # ίδιο transcript = ίδιο αρχείο, γράφεται μία φορά
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tmp = os.path.join(directory, f".tmp-{os.getpid()}-{id(self)}.jsonl.gz")
+        self.sha = hashlib.sha256()
+        self.attachments = {}   # key -> αριθμός μέσα στο transcript
+        self.messages = 0
+        self._file = None
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # mtime=0 ώστε το ίδιο περιεχόμενο να δίνει ακριβώς τα ίδια bytes
+        self._file = gzip.GzipFile(self.tmp, "wb", mtime=0)
+
+    def lines(self, page) -> bytes:
+        out = []
+        for message in page:
+            refs = []
+            for attachment in message.attachments:
+                key = _attachment_key(attachment.url)
+                if key not in self.attachments:
+                    self.attachments[key] = len(self.attachments)
+                    out.append({"type": "attachment", "id": self.attachments[key],
+                                "filename": attachment.filename, "url": attachment.url, "size": attachment.size})
+                refs.append(self.attachments[key])
+            out.append({
+                "type": "message",
+                "id": message.id,
+                "author_id": message.author.id,
+                "author": str(message.author),
+                "created_at": message.created_at.isoformat(),
+                "content": message.content,
+                "embeds": [e.to_dict() for e in message.embeds],
+                "attachments": refs,
+            })
+            self.messages += 1
+        return b"".join(json.dumps(o, ensure_ascii=False, separators=(",", ":")).encode() + b"\n" for o in out)
+
+    def write(self, data: bytes):
+        self.sha.update(data)
+        self._file.write(data)
+
+    def finish(self) -> str:
+        self._file.close()
+        digest = self.sha.hexdigest()
+        path = transcript_path(self.directory, digest)
+        if os.path.exists(path):
+            os.remove(self.tmp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(self.tmp, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(self.tmp, path)
+        return digest
+
+    def abort(self):
+        if self._file is not None:
+            self._file.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def transcript_path(directory: str, digest: str) -> str:
+    return os.path.join(directory, digest[:2], f"{digest}.jsonl.gz")
+
+
+class TranscriptArchive:
+    # Το transcript ενός ticket γράφεται πριν σβηστεί το κανάλι. Ο πίνακας
+    # transcripts είναι το ευρετήριο (owner/reason), οπότε το !transcript δεν ανοίγει αρχεία.
+    def __init__(self, directory=TRANSCRIPT_DIR, database=db):
+        self.directory = directory
+        self.db = database
+
+    async def archive(self, channel: discord.TextChannel, ticket: dict = None) -> dict:
+        writer = TranscriptWriter(self.directory)
+        await asyncio.to_thread(writer.open)
+        try:
+            async for page in history_pages(channel):
+                await asyncio.to_thread(writer.write, writer.lines(page))
+            digest = await asyncio.to_thread(writer.finish)
+        except BaseException:
+            await asyncio.to_thread(writer.abort)
+            raise
+
+        ticket = ticket or {}
+        entry = {
+            "channel_id": channel.id,
+            "guild_id": channel.guild.id,
+            "owner_id": ticket.get("owner_id"),
+            "reason": ticket.get("reason"),
+            "channel_name": channel.name,
+            "closed_at": time.time(),
+            "digest": digest,
+            "messages": writer.messages,
+        }
+        # Απευθείας στη βάση: το κανάλι σβήνεται αμέσως μετά
+        await self.db.execute(
+            f"INSERT OR REPLACE INTO transcripts({', '.join(INDEX_COLUMNS)}) "
+            f"VALUES ({', '.join('?' * len(INDEX_COLUMNS))})",
+            tuple(entry[c] for c in INDEX_COLUMNS)
+        )
+        return entry
+
+    async def find(self, guild_id: int, owner_id: int = None, reason: str = None, limit: int = 10) -> list:
+        sql = f"SELECT {', '.join(INDEX_COLUMNS)} FROM transcripts WHERE guild_id = ?"
+        params = [guild_id]
+        if owner_id is not None:
+            sql += " AND owner_id = ?"
+            params.append(owner_id)
+        if reason:
+            sql += " AND reason = ?"
+            params.append(reason)
+        sql += " ORDER BY closed_at DESC LIMIT ?"
+        params.append(limit)
+        return [dict(zip(INDEX_COLUMNS, row)) for row in await self.db.fetchall(sql, tuple(params))]
+
+    def path(self, entry: dict) -> str:
+        return transcript_path(self.directory, entry["digest"])
+
+
+transcript_archive = TranscriptArchive()
@@ -1,6 +1,56 @@
 import discord
-
-def generate_embed(server: dict, context: str) -> discord.Embed:
+import hashlib
+import json
+from functools import lru_cache
+
+RENDER_CACHE_SIZE = 1024
+
+CHRONICLE_COLORS = {
+    chronicle: discord.Color(int(hex_code.lstrip("#"), 16))
+    for chronicle, hex_code in {
+        "interlude": "#1C7BB9",
+        "high five": "#8552f2",
+        "essence": "#016903",
+        "classic": "#314507",
+        "how": "#4c1ea1",
+        "rod": "#4c1ea1",
+        "sod": "#4c1ea1",
+        "gracia final": "#f29829",
+        "gracia epilogue": "#f29828",
+        "freya": "#3b9cd9"
+    }.items()
+}
+DEFAULT_COLOR = discord.Color(0x95a5a6)
+
+FEATURE_MAP = {
+    "auto_farm": "Auto Farm",
+    "buff_store": "NPC Buffer",
+    "custom_events": "Auto Events",
+    "retail": "Retail Like",
+    "dualbox_limit": "Multi-Box",
+    "customs": "Custom Items",
+    "skins": "Costumes",
+    "global_gk": "Global GK",
+    "multi_server": "Multi Server",
+    "gm_shop": "GM Shop"
+}
+
+STYLE_LABELS = {
+    "pvp server": "🗡️ PvP Server",
+    "craft server": "⛏️ Craft Server",
+    "low rate": "🌿 Low Rates"
+}
+
+# Τα πεδία του server που επηρεάζουν το embed
+RENDER_FIELDS = (
+    "name", "chronicle", "style", "rates", "spoil", "votes", "website",
+    "discord", "thumbnail", "image", "premium", *FEATURE_MAP, "rank"
+)
+
+
+@lru_cache(maxsize=RENDER_CACHE_SIZE)
+def _render(fields: tuple, context: str):
+    server = dict(fields)
     name = server.get("name", "Unknown Server")
     chronicle = server.get("chronicle", "Unknown")
     style = server.get("style", None)
@@ -40,48 +90,17 @@ def generate_embed(server: dict, context: str) -> discord.Embed:
     if premium:
         color = discord.Color.gold()
     else:
-        chronicle_colors = {
-            "interlude": "#1C7BB9",
-            "high five": "#8552f2",
-            "essence": "#016903",
-            "classic": "#314507",
-            "how": "#4c1ea1",
-            "rod": "#4c1ea1",
-            "sod": "#4c1ea1",
-            "gracia final": "#f29829",
-            "gracia epilogue": "#f29828",
-            "freya": "#3b9cd9"
-        }
-        hex_code = chronicle_colors.get(chronicle.lower().strip(), "#95a5a6")
-        color = discord.Color(int(hex_code.lstrip("#"), 16))
+        color = CHRONICLE_COLORS.get(chronicle.lower().strip(), DEFAULT_COLOR)
 
     # Features
-    feature_map = {
-        "auto_farm": "Auto Farm",
-        "buff_store": "NPC Buffer",
-        "custom_events": "Auto Events",
-        "retail": "Retail Like",
-        "dualbox_limit": "Multi-Box",
-        "customs": "Custom Items",
-        "skins": "Costumes",
-        "global_gk": "Global GK",
-        "multi_server": "Multi Server",
-        "gm_shop": "GM Shop"
-    }
-
-    enabled_features = [label for key, label in feature_map.items() if server.get(key) is True]
+    enabled_features = [label for key, label in FEATURE_MAP.items() if server.get(key) is True]
     features_text = " • ".join(enabled_features) if enabled_features else "N/A"
 
     
     sep = "\u202F•\u202F"
     sep2 = "\u202F\u202F\u202F•\u202F\u202F\u202F"
 
-    style_labels = {
-        "pvp server": "🗡️ PvP Server",
-        "craft server": "⛏️ Craft Server",
-        "low rate": "🌿 Low Rates"
-    }
-    style_label = f"**{style_labels.get(style.lower(), style)}**" if style else ""
+    style_label = f"**{STYLE_LABELS.get(style.lower(), style)}**" if style else ""
 
 
     # 📦 Description
@@ -114,12 +133,45 @@ def generate_embed(server: dict, context: str) -> discord.Embed:
             f"📌 **More infos:** 🔗 **Visit:** [Website]({website}){sep}💬 **Join:** [Server's Community]({discord_link})"
         )
 
-    # Embed
+    return title, description, color, thumbnail, image if premium else None
+
+
+def render_key(server: dict, context: str) -> tuple:
+    # Μόνο τα πεδία που εμφανίζονται στο embed. Το rank μετράει μόνο στο leaderboard.
+    return tuple(
+        (key, server[key]) for key in RENDER_FIELDS
+        if key in server and (key != "rank" or context == "leaderboard")
+    )
+
+
+def render_hash(server: dict, context: str) -> str:
+    # Σταθερό hash του περιεχομένου, για να ξέρουμε αν χρειάζεται edit
+    payload = json.dumps([context, render_key(server, context)], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def generate_embed(server: dict, context: str) -> discord.Embed:
+    title, description, color, thumbnail, image = _render(render_key(server, context), context)
+
+    # Το Embed είναι mutable, οπότε φτιάχνουμε καινούργιο από τα cached κομμάτια
     embed = discord.Embed(title=title, description=description, color=color)
     if thumbnail:
         embed.set_thumbnail(url=thumbnail)
-    if premium and image:
+    if image:
         embed.set_image(url=image)
 
-
     return embed
+
+
+def chunk_embeds(lines, title: str, color: discord.Color, max_chars=3900) -> list:
+    # Σπάσιμο σε πολλά embeds αν ξεπερνάμε το όριο χαρακτήρων
+    embeds = []
+    current = ""
+    for line in lines:
+        if current and len(current) + len(line) > max_chars:
+            embeds.append(discord.Embed(title=title, description=current, color=color))
+            current = ""
+        current += line + "\n"
+    if current:
+        embeds.append(discord.Embed(title=title, description=current, color=color))
+    return embeds
@@ -1,116 +1,71 @@
 
 import discord
-from discord.ui import Button, View
-from utils import generate_embed
-import json
+from discord.ui import Button, View, DynamicItem
+from analytics import vote_rollups
+from db import db
+from journal import vote_journal
+from dispatch import respond, edit_message
+from guilds import guild_states
+from pipeline import vote_pipeline
+import asyncio
 import datetime
-import os
 
-VOTES_FILE = "votes.json"
-SERVERS_FILE = "servers.json"
-
-def load_votes():
-    if os.path.exists(VOTES_FILE):
-        with open(VOTES_FILE, "r") as f:
-            content = f.read().strip()
-            if content:
-                return json.loads(content)
-    return {}
-
-def save_votes(votes):
-    with open(VOTES_FILE, "w") as f:
-        json.dump(votes, f)
-
-def load_servers():
-    if os.path.exists(SERVERS_FILE):
-        with open(SERVERS_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-class VoteButton(Button):
+class VoteButton(DynamicItem[Button], template=r"vote_(?P<server_id>.+)"):
+    # Ένας handler για όλα τα κουμπιά ψήφου: ο server βρίσκεται από το custom_id
+    # τη στιγμή του κλικ, οπότε δεν κρατάμε ένα View ανά server στη μνήμη
     def __init__(self, server_id):
         super().__init__(
-            label="Vote",
-            style=discord.ButtonStyle.primary,
-            custom_id=f"vote_{server_id}"
+            Button(
+                label="Vote",
+                style=discord.ButtonStyle.primary,
+                custom_id=f"vote_{server_id}"
+            )
         )
         self.server_id = server_id
 
-    async def callback(self, interaction: discord.Interaction):
-        user_id = str(interaction.user.id)
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        votes = load_votes()
-        servers = load_servers()
-
-        server = next((s for s in servers if s['name'].lower() == self.server_id.lower()), None)
-        if not server or "message_id" not in server:
-            await interaction.response.send_message("⚠️ Server didn't respond.", ephemeral=True)
-            return
-
-        server_name = server["name"]
-
-        for data in votes.values():
-            if today in data.get("by_day", {}) and user_id in data["by_day"][today]:
-                await interaction.response.send_message("❗ You have already voted a server today.", ephemeral=True)
-                return
-
-        if server_name not in votes:
-            votes[server_name] = {"total": 0, "by_day": {}}
-        if today not in votes[server_name]["by_day"]:
-            votes[server_name]["by_day"][today] = []
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        # Νέα κουμπιά: vote_<id>. Παλιά μηνύματα μπορεί να έχουν ακόμα vote_<όνομα>
+        server_id = match["server_id"]
+        return cls(int(server_id) if server_id.isdigit() else server_id)
 
-        votes[server_name]["by_day"][today].append(user_id)
-        votes[server_name]["total"] += 1
-        save_votes(votes)
+    def resolve(self, state):
+        # Μόνο οι servers του guild όπου πατήθηκε το κουμπί
+        server = None
+        if isinstance(self.server_id, int):
+            server = state.servers.get_by_id(self.server_id)
+        return server or state.servers.get(str(self.server_id))
 
-        # Απόδοση ρόλου
+    async def callback(self, interaction: discord.Interaction):
+        user_id = str(interaction.user.id)
+        now = datetime.datetime.now()
+        today = now.strftime("%Y-%m-%d")
         guild = interaction.guild
-        if guild is None:
-            await interaction.response.send_message("⚠️ Server didn't respond.", ephemeral=True)
+        state = guild_states.get(guild.id) if guild else None
+        server = self.resolve(state) if state else None
+        if not server or "message_id" not in server:
+            await respond(interaction, "⚠️ Server didn't respond.", ephemeral=True)
             return
 
-        voter_role = discord.utils.get(guild.roles, name="✅ Voter")
-        member = guild.get_member(interaction.user.id)
-        if member and voter_role:
-            await member.add_roles(voter_role)
-
-        # Ενημέρωση του embed στο 📜server-list
-        channel = discord.utils.get(guild.text_channels, name="📜︱server-list")
-        if not channel:
-            await interaction.response.send_message("❌ Channel 📜︱server-list not found.", ephemeral=True)
+        if state.votes.has_voted(user_id, today):
+            await respond(interaction, "❗ You have already voted a server today.", ephemeral=True)
             return
 
-        try:
-            message = await channel.fetch_message(server["message_id"])
-        except discord.NotFound:
-            await interaction.response.send_message("⚠️ Server didn't respond.", ephemeral=True)
-            return
+        # Καταγραφή της ψήφου: μνήμη + write-behind, και μια εγγραφή στο journal
+        server["votes"] = state.votes.add_vote(server["id"], user_id, today, persist=False)
+        state.servers.save(server)
+        vote_rollups.record(server["id"], now)
+        durable = vote_journal.append(guild.id, server["id"], interaction.user.id, now)
 
-        server["votes"] = votes[server_name]["total"]
-        embed = generate_embed(server, context="serverlist")
-        await message.edit(embed=embed, view=VoteView(server["name"]))
-
-        # Ενημέρωση servers.json
-        with open(SERVERS_FILE, "w") as f:
-            json.dump(servers, f, indent=2)
-
-        # ✅ Live update leaderboard embed
+        # Η απάντηση φεύγει αφού η ψήφος γίνει fsync (ένα κοινό fsync για όσες έρθουν μαζί)
         try:
-            message_id = server.get("leaderboard_message_id")
-            if message_id:
-                leaderboard_channel = discord.utils.get(guild.text_channels, name="🥇︱leaderboards")
-                if leaderboard_channel:
-                    try:
-                        leaderboard_msg = await leaderboard_channel.fetch_message(message_id)
-                        leaderboard_embed = generate_embed(server, context="leaderboard")
-                        await leaderboard_msg.edit(embed=leaderboard_embed)
-                    except discord.NotFound:
-                        print(f"❌ Δεν βρέθηκε leaderboard μήνυμα για {server['name']}")
-        except Exception as e:
-            print(f"⚠️ Σφάλμα κατά το live refresh του leaderboard: {e}")
+            await durable
+        except OSError:
+            pass
 
-        # ✅ Τελικό μήνυμα στον χρήστη
-        await interaction.response.send_message(
+        # ✅ Τελικό μήνυμα στον χρήστη, πριν από οποιοδήποτε άλλο API call
+        await respond(
+            interaction,
             "✅ Thank you for voting!\n\n"
             "You now have full access to:\n"
             "🏆 Leaderboards\n"
@@ -121,9 +76,35 @@ class VoteButton(Button):
             ephemeral=True
         )
 
+        # Ρόλος και embeds (📜server-list + leaderboard) στο background
+        if isinstance(interaction.user, discord.Member):
+            vote_pipeline.grant_role(guild, interaction.user)
+        vote_pipeline.refresh_embeds(guild, server)
+
 
 
 class VoteView(View):
+    # Μόνο για αποστολή/edit μηνυμάτων, δεν χρειάζεται add_view
     def __init__(self, server_id):
         super().__init__(timeout=None)
         self.add_item(VoteButton(server_id))
+
+
+async def rekey_vote_buttons(bot):
+    # Μία φορά μετά τη μετάβαση σε server ids: τα μηνύματα του 📜︱server-list
+    # παίρνουν κουμπιά vote_<id>. Όσα αποτύχουν συνεχίζουν να δουλεύουν με το όνομα.
+    if not await db.get_meta("vote_buttons_rekey_pending"):
+        return
+    edits = []
+    for guild in bot.guilds:
+        state = guild_states.get(guild.id)
+        channel = state.channel(guild, "server_list_channel")
+        if channel:
+            edits += [
+                edit_message(channel, server["message_id"], view=VoteView(server["id"]))
+                for server in state.servers.with_message_id()
+            ]
+    results = await asyncio.gather(*edits, return_exceptions=True)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    await db.set_meta("vote_buttons_rekey_pending", False)
+    print(f"🔢 Vote buttons rekeyed: {len(edits) - failed} messages ({failed} failed)")